@@ -1,45 +1,92 @@
 import asyncio
 import os
+import time
 
 from aiogram import Bot, Dispatcher, types
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
 from aiogram.filters import Command
-from sqlalchemy import create_engine, Column, Integer, String, Boolean
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
+from database import database, TgUser
+from utils.cache_versions import get_cache_version, TG_USERS
+
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
-DATABASE_URL = os.getenv("DATABASE_URL")
 
 # URL мини-приложения
 WEB_APP_URL = os.getenv("WEB_APP_URL")
 
+# Кэш ников: размер, время жизни записи и период проверки версии tg_users (в секундах)
+TG_USERS_CACHE_SIZE = int(os.getenv("TG_USERS_CACHE_SIZE", "10000"))
+TG_USERS_CACHE_TTL = float(os.getenv("TG_USERS_CACHE_TTL", "300"))
+TG_USERS_CACHE_POLL = float(os.getenv("TG_USERS_CACHE_POLL", "5"))
+
 # Инициализация бота
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
 
-# Инициализация SQLAlchemy
-Base = declarative_base()
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-session = Session()
-
-
-class TgUser(Base):
-    __tablename__ = "tg_users"
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    tg_username = Column(String, unique=True, nullable=False)
-    username = Column(String, unique=True, nullable=False)
+# tg_username -> username; None в значении означает "гость" (такого ника нет в базе)
+_users_cache = TTLCache(maxsize=TG_USERS_CACHE_SIZE, ttl=TG_USERS_CACHE_TTL)
+_users_cache_version = None
+# Маркер промаха: None в кэше — это закэшированный "гость"
+_MISSING = object()
+# Момент последней сверки версии tg_users (time.monotonic)
+_users_cache_checked_at = None
+_users_cache_refresh_lock = asyncio.Lock()
 
 
 # Функция для получения имени пользователя по нику в Telegram
 async def get_user_by_tg_username(tg_username: str) -> str:
-    user = session.query(TgUser).filter_by(tg_username=tg_username).first()
+    # Отсутствующих пользователей тоже кэшируем, чтобы повторные /start от гостей не ходили в базу.
+    # Одно обращение get вместо проверки in и чтения: запись может истечь между ними
+    cached = _users_cache.get(tg_username, _MISSING)
+    if cached is not _MISSING:
+        return cached
+
+    # Асинхронный запрос через общий пул соединений: не блокирует event loop
+    user = await database.fetch_one(
+        TgUser.__table__.select().where(TgUser.tg_username == tg_username)
+    )
     print(f"User from DB: {user}")  # Логирование для проверки
-    return user.username if user else None
+    username = user.username if user else None
+    # Возвращаем локальное значение: записи в кэше уже может не быть (вытеснена или истекла)
+    _users_cache[tg_username] = username
+    return username
+
+
+async def refresh_tg_users_cache():
+    # Админка увеличивает версию tg_users при каждом изменении; как только она сменилась — сбрасываем кэш
+    global _users_cache_version, _users_cache_checked_at
+    checked_at = time.monotonic()
+    version = await get_cache_version(database, TG_USERS)
+    if version != _users_cache_version:
+        _users_cache.clear()
+        _users_cache_version = version
+    _users_cache_checked_at = checked_at
+
+
+async def refresh_tg_users_cache_if_due():
+    # В режиме webhook фоновой задачи нет: версию сверяем перед обновлением, но не чаще раза в TG_USERS_CACHE_POLL секунд
+    def due():
+        return _users_cache_checked_at is None or time.monotonic() - _users_cache_checked_at >= TG_USERS_CACHE_POLL
+
+    if not due():
+        return
+    async with _users_cache_refresh_lock:
+        # Параллельные обработчики ждут одну сверку, а не делают каждый свою
+        if due():
+            await refresh_tg_users_cache()
+
+
+async def watch_tg_users_version():
+    while True:
+        try:
+            await refresh_tg_users_cache()
+        except Exception as e:
+            print(f"Ошибка проверки версии tg_users: {str(e)}")
+        await asyncio.sleep(TG_USERS_CACHE_POLL)
 
 
 @dp.message(Command("start"))
@@ -79,8 +126,19 @@ async def start_command_handler(message: types.Message):
 
 
 async def main():
-    # Запуск бота
-    await dp.start_polling(bot)
+    if os.getenv("BOT_WEBHOOK_URL"):
+        print("Задан BOT_WEBHOOK_URL: обновления принимает FastAPI-приложение, polling не запускается")
+        return
+
+    # Запуск бота; webhook, оставшийся от прежнего режима, снимаем, иначе getUpdates вернёт ошибку
+    await bot.delete_webhook()
+    await database.connect()
+    watcher = asyncio.create_task(watch_tg_users_version())
+    try:
+        await dp.start_polling(bot)
+    finally:
+        watcher.cancel()
+        await database.disconnect()
 
 
 if __name__ == "__main__":
@@ -4,9 +4,11 @@ from enum import unique
 from databases import Database
 from fastapi import APIRouter
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import Column, Integer, String, ForeignKey, MetaData, create_engine, Boolean, Numeric
+from sqlalchemy import Column, Integer, String, ForeignKey, MetaData, create_engine, Boolean, Numeric, Text, DateTime, Date, Float, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from alembic.config import Config
+from alembic.script import ScriptDirectory
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,7 +18,14 @@ templates = Jinja2Templates(directory="templates")
 
 # Строка подключения к базе данных
 DATABASE_URL = os.getenv("DATABASE_URL")
-database = Database(DATABASE_URL)
+# Размер пула соединений; у SQLite пула нет, поэтому параметры передаём только серверным СУБД
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+pool_options = {} if DATABASE_URL.startswith("sqlite") else {
+    "min_size": DB_POOL_MIN_SIZE,
+    "max_size": DB_POOL_MAX_SIZE,
+}
+database = Database(DATABASE_URL, **pool_options)
 metadata = MetaData()
 
 # Создаем базовый класс для моделей
@@ -64,8 +73,7 @@ class Categories(Base):
     __tablename__ = "categories"
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, unique=False, nullable=False)
-    # operation_id = Column(Integer, ForeignKey("operations.id"))
-    operation_name = Column(String, ForeignKey("operations.name"))
+    operation_id = Column(Integer, ForeignKey("operations.id"), index=True)
 
     operations = relationship("Operations", back_populates="categories")
     articles = relationship("Articles", back_populates="categories")
@@ -75,9 +83,7 @@ class Articles(Base):
     __tablename__ = "articles"
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String, unique=False, nullable=False)
-    # category_id = Column(Integer, ForeignKey("categories.id"))
-    category_name = Column(String, ForeignKey("categories.name"))
-    category_operation = Column(String, unique=False, nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), index=True)
 
     categories = relationship("Categories", back_populates="articles")
 
@@ -93,19 +99,90 @@ class FinancialOperations(Base):
     __tablename__ = "financial_operations"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    timestamp = Column(String, nullable=False)
+    timestamp = Column(DateTime, nullable=False)  # Время создания по Москве
     username = Column(String, nullable=False)
-    operation_date = Column(String, nullable=False)
+    operation_date = Column(Date, nullable=False, index=True)
     operation_type = Column(String, nullable=False)
     accounting_type = Column(String, nullable=False)
     account_type = Column(String, nullable=False)
-    finish_date = Column(String)
-    amount = Column(String, nullable=False)
+    finish_date = Column(Date)
+    amount = Column(Numeric(12, 2), nullable=False)
     payment_type = Column(String, nullable=False)
     comment = Column(String)
     wallet = Column(String)
     wallet_from = Column(String)
     wallet_to = Column(String)
+    import_batch = Column(String, index=True)  # Метка пакета массового импорта (services/operation_import.py)
+
+    __table_args__ = (
+        Index("ix_financial_operations_username_timestamp", "username", "timestamp"),
+    )
+
+
+class WalletLedger(Base):
+    # Журнал движений по кошелькам: записи только добавляются, баланс кошелька равен сумме его записей.
+    # Внешних ключей нет намеренно — записи остаются в журнале после удаления операции или кошелька
+    __tablename__ = "wallet_ledger"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    wallet_id = Column(Integer, nullable=False, index=True)
+    operation_id = Column(Integer, index=True)
+    amount = Column(Numeric(12, 2), nullable=False)
+    reason = Column(String, nullable=False)  # create / edit / delete / import / correction
+    created_at = Column(DateTime, nullable=False)
+
+
+class OperationTotals(Base):
+    # Сводка для отчётов: суммы операций по месяцу, виду, категории, контрагенту и кошельку.
+    # Поддерживается при каждом добавлении, изменении и удалении операции (utils/operation_totals.py)
+    __tablename__ = "operation_totals"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    month = Column(Date, nullable=False)  # Первое число месяца операции
+    operation_type = Column(String, nullable=False)
+    accounting_type = Column(String, nullable=False, default="")
+    account_type = Column(String, nullable=False, default="")
+    wallet = Column(String, nullable=False, default="")
+    amount_in = Column(Numeric(14, 2), nullable=False, default=0)  # Поступления в кошелёк
+    amount_out = Column(Numeric(14, 2), nullable=False, default=0)  # Списания с кошелька
+
+    __table_args__ = (
+        UniqueConstraint(
+            "month", "operation_type", "accounting_type", "account_type", "wallet",
+            name="uq_operation_totals_key",
+        ),
+    )
+
+
+class SheetsOutbox(Base):
+    # Очередь записей для Google Таблицы, которую разбирает фоновый воркер
+    __tablename__ = "sheets_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    operation_id = Column(Integer, nullable=False, index=True)
+    # Последний id операции, если запись несёт строки нескольких операций (массовый импорт)
+    last_operation_id = Column(Integer)
+    rows = Column(Text, nullable=False)  # JSON-список строк для листа "Журнал операций"
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime, nullable=False)
+
+
+class CacheVersions(Base):
+    # Версии закэшированных данных: запись в таблицу сообщает другим процессам (боту), что кэш устарел
+    __tablename__ = "cache_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class TokenRevocations(Base):
+    # Отзыв токенов веб-пользователя: токены, выданные раньше revoked_at (Unix-время), не принимаются
+    __tablename__ = "token_revocations"
+
+    username = Column(String, primary_key=True)
+    revoked_at = Column(Float, nullable=False)
 
 
 # Создаем асинхронный engine для работы с базой данных SQLAlchemy
@@ -113,17 +190,25 @@ engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-# Асинхронная функция для создания таблиц
-async def init_db():
-    # Создаем таблицы в базе данных
-    Base.metadata.create_all(bind=engine)
+# Схему создают и обновляют миграции Alembic (migrations/, команда alembic upgrade head)
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
 
 
-async def get_db():
-    # Возвращаем объект базы данных для использования в зависимостях
-    if not database.is_connected:
-        await database.connect()
+async def check_schema_version():
+    # При старте только сверяем версию схемы с последней миграцией, ничего не создавая
+    head = ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_current_head()
     try:
+        current = await database.fetch_val("SELECT version_num FROM alembic_version")
+    except Exception:
+        current = None
+    if current != head:
+        raise RuntimeError(
+            f"Версия схемы базы данных {current}, ожидается {head}: выполните alembic upgrade head"
+        )
+
+
+async def get_db():
+    # Пул открывается один раз при старте приложения (см. main.py);
+    # на время запроса берём из него одно соединение и возвращаем его после ответа
+    async with database.connection():
         yield database
-    finally:
-        await database.disconnect()
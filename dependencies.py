@@ -1,6 +1,21 @@
 from fastapi import Request, HTTPException, status
-from fastapi.responses import RedirectResponse
-from services.auth import decode_access_token
+from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.templating import Jinja2Templates
+from database import database
+from services.auth import decode_access_token, refresh_revoked_tokens
+
+templates = Jinja2Templates(directory="templates")
+
+
+class NotAuthenticatedError(Exception):
+    """Нет токена или он недействителен: обработчик перенаправляет на /login."""
+
+    def __init__(self, token_missing: bool):
+        self.token_missing = token_missing
+
+
+class AccessDeniedError(Exception):
+    """У пользователя нет нужной роли."""
 
 
 # Функция для получения токена из cookie
@@ -22,12 +37,62 @@ def get_current_user(token: str):
     return payload
 
 
+async def get_principal(request: Request):
+    # Токен разбирается один раз за запрос; payload (или None) остаётся в request.state.user
+    # и доступен остальным зависимостям, middleware и логам
+    if not hasattr(request.state, "user"):
+        token = request.cookies.get("token")
+        if token:
+            # Отзывы токенов могли прийти из другого процесса; версию сверяем раз в TOKEN_REVOCATIONS_POLL секунд
+            await refresh_revoked_tokens(database)
+        request.state.user = decode_access_token(token) if token else None
+    return request.state.user
+
+
+def require_role(*roles: str):
+    # Зависимость для маршрутов: Depends(require_role("admin")). Без ролей проверяет только вход
+    async def dependency(request: Request):
+        user = await get_principal(request)
+        if user is None:
+            raise NotAuthenticatedError(token_missing=not request.cookies.get("token"))
+        if roles and user.get("role") not in roles:
+            raise AccessDeniedError()
+        return user
+
+    return dependency
+
+
+async def not_authenticated_handler(request: Request, exc: NotAuthenticatedError):
+    response = RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
+    if exc.token_missing:
+        # После входа вернём пользователя на запрошенную страницу
+        response.set_cookie("original_url", str(request.url), max_age=60)
+    return response
+
+
+def _wants_page(request: Request) -> bool:
+    # DELETE отправляется из JS, а JSON-маршруты и API-клиенты не ждут HTML: им отвечаем JSON
+    if request.method == "DELETE":
+        return False
+    response_class = getattr(request.scope.get("route"), "response_class", None)
+    if isinstance(response_class, type) and issubclass(response_class, JSONResponse):
+        return False
+    return "text/html" in request.headers.get("accept", "")
+
+
+async def access_denied_handler(request: Request, exc: AccessDeniedError):
+    # Код 403 в обоих случаях, чтобы отказ нельзя было принять за успешный ответ
+    if not _wants_page(request):
+        return JSONResponse({"detail": "Access denied"}, status_code=403)
+    return templates.TemplateResponse("not_access.html", {"request": request}, status_code=403)
+
+
 async def get_authenticated_user(request: Request):
     # Проверка токена и текущего пользователя
     token = get_token_from_cookie(request)
     if isinstance(token, RedirectResponse):
         return token
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
+    payload = await get_principal(request)
+    if payload is None:
+        return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
     return payload
@@ -2,9 +2,16 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from database import init_db, database
-from routes import users, auth_routes, bot_add, tg_users, main_directory
+from database import check_schema_version, database
+from dependencies import (
+    AccessDeniedError, NotAuthenticatedError, access_denied_handler, not_authenticated_handler
+)
+from routes import users, auth_routes, bot_add, tg_users, main_directory, bot_webhook, operations_import, operations_export, reports
 from routes.directory import payment_types, operations, categories, articles, wallets
+from services.auth import shutdown_password_executor
+from services.bot_webhook import start_bot_webhook, stop_bot_webhook
+from services.sheets import shutdown_sheets_executor
+from services.sheets_sync import start_sheets_sync_worker, stop_sheets_sync_worker
 
 app = FastAPI()
 
@@ -14,6 +21,10 @@ app.include_router(auth_routes.router)
 app.include_router(users.router)
 app.include_router(bot_add.router)
 app.include_router(tg_users.router)
+app.include_router(bot_webhook.router)
+app.include_router(operations_import.router)
+app.include_router(operations_export.router)
+app.include_router(reports.router)
 
 app.include_router(payment_types.router)
 app.include_router(operations.router)
@@ -23,15 +34,28 @@ app.include_router(wallets.router)
 
 app.include_router(main_directory.router)
 
+# Ответы на ошибки зависимости require_role: перенаправление на вход или страница "нет доступа"
+app.add_exception_handler(NotAuthenticatedError, not_authenticated_handler)
+app.add_exception_handler(AccessDeniedError, access_denied_handler)
+
 
 @app.on_event("startup")
 async def startup():
-    # При старте приложения создаем таблицы
-    await init_db()
+    # При старте приложения открываем пул соединений и проверяем, что миграции применены
+    await database.connect()
+    await check_schema_version()
+    # Запускаем фоновую отправку операций в Google Таблицу
+    start_sheets_sync_worker()
+    # В режиме webhook обновления Telegram обрабатываются здесь же (см. services/bot_webhook.py)
+    await start_bot_webhook()
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    await stop_bot_webhook()
+    await stop_sheets_sync_worker()
+    shutdown_sheets_executor()
+    shutdown_password_executor()
     # Отключаемся от базы данных при завершении работы
     await database.disconnect()
 
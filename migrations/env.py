@@ -0,0 +1,54 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from database import Base, DATABASE_URL
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Объекты полнотекстового поиска создаются миграцией 0007 вручную и в моделях не описаны
+SEARCH_OBJECTS_PREFIXES = ("financial_operations_fts", "ix_financial_operations_search")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (reflected and name and name.startswith(SEARCH_OBJECTS_PREFIXES))
+
+
+
+def run_migrations_offline():
+    # alembic upgrade --sql: печатает SQL без подключения к базе
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=DATABASE_URL.startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = create_engine(DATABASE_URL, poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        # SQLite не умеет ALTER TABLE для большинства изменений — Alembic пересоздаёт таблицу (batch mode)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,114 @@
+"""Исходная схема: таблицы в том виде, в каком их создавал create_all
+
+На существующей базе эту ревизию не применяют, а отмечают: alembic stamp 0001_initial
+(после python -m utils.migrate_operations, если financial_operations ещё со строковыми колонками).
+
+Revision ID: 0001_initial
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_initial"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "web_users",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("username", sa.String(), nullable=False, unique=True),
+        sa.Column("password", sa.String(), nullable=False),
+        sa.Column("role", sa.String(), nullable=False, server_default="user"),
+    )
+    op.create_table(
+        "tg_users",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("tg_username", sa.String(), nullable=False, unique=True),
+        sa.Column("username", sa.String(), nullable=False, unique=True),
+        sa.Column("buttons", sa.Boolean(), nullable=False),
+    )
+    op.create_table(
+        "wallets",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(), nullable=False, unique=True),
+        sa.Column("username", sa.Integer(), sa.ForeignKey("web_users.username")),
+        sa.Column("balance", sa.Numeric(10, 2), nullable=False),
+    )
+    op.create_table(
+        "operations",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(), nullable=False, unique=True),
+    )
+    op.create_table(
+        "categories",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("operation_name", sa.String(), sa.ForeignKey("operations.name")),
+    )
+    op.create_table(
+        "articles",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("category_name", sa.String(), sa.ForeignKey("categories.name")),
+        sa.Column("category_operation", sa.String(), nullable=False),
+    )
+    op.create_table(
+        "payment_types",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(), nullable=False, unique=True),
+    )
+    op.create_table(
+        "financial_operations",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("operation_date", sa.Date(), nullable=False),
+        sa.Column("operation_type", sa.String(), nullable=False),
+        sa.Column("accounting_type", sa.String(), nullable=False),
+        sa.Column("account_type", sa.String(), nullable=False),
+        sa.Column("finish_date", sa.Date()),
+        sa.Column("amount", sa.Numeric(12, 2), nullable=False),
+        sa.Column("payment_type", sa.String(), nullable=False),
+        sa.Column("comment", sa.String()),
+        sa.Column("wallet", sa.String()),
+        sa.Column("wallet_from", sa.String()),
+        sa.Column("wallet_to", sa.String()),
+    )
+    op.create_index(
+        "ix_financial_operations_username_timestamp", "financial_operations", ["username", "timestamp"]
+    )
+    op.create_table(
+        "sheets_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("operation_id", sa.Integer(), nullable=False),
+        sa.Column("rows", sa.Text(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.Text()),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_sheets_outbox_operation_id", "sheets_outbox", ["operation_id"])
+    op.create_table(
+        "cache_versions",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("cache_versions")
+    op.drop_index("ix_sheets_outbox_operation_id", table_name="sheets_outbox")
+    op.drop_table("sheets_outbox")
+    op.drop_index("ix_financial_operations_username_timestamp", table_name="financial_operations")
+    op.drop_table("financial_operations")
+    op.drop_table("payment_types")
+    op.drop_table("articles")
+    op.drop_table("categories")
+    op.drop_table("operations")
+    op.drop_table("wallets")
+    op.drop_table("tg_users")
+    op.drop_table("web_users")
@@ -0,0 +1,26 @@
+"""Индексы на колонках, по которым ищут справочники
+
+wallets.name и tg_users.tg_username уже проиндексированы своими ограничениями UNIQUE,
+а financial_operations.username — первой колонкой индекса (username, timestamp),
+поэтому отдельные индексы нужны только связям категорий и статей.
+
+Revision ID: 0002_lookup_indexes
+Revises: 0001_initial
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002_lookup_indexes"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_categories_operation_name", "categories", ["operation_name"])
+    op.create_index("ix_articles_category_name", "articles", ["category_name"])
+
+
+def downgrade():
+    op.drop_index("ix_articles_category_name", table_name="articles")
+    op.drop_index("ix_categories_operation_name", table_name="categories")
@@ -0,0 +1,88 @@
+"""Связи категорий и контрагентов по целочисленным id вместо названий
+
+categories.operation_name → categories.operation_id,
+articles.category_name и articles.category_operation → articles.category_id.
+Существующие связи переносятся по названиям; у контрагента категория ищется
+с учётом операции, так как названия категорий в разных операциях повторяются.
+
+Revision ID: 0003_directory_integer_keys
+Revises: 0002_lookup_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_directory_integer_keys"
+down_revision = "0002_lookup_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("categories") as batch:
+        batch.add_column(sa.Column("operation_id", sa.Integer()))
+    with op.batch_alter_table("articles") as batch:
+        batch.add_column(sa.Column("category_id", sa.Integer()))
+
+    op.execute("""
+        UPDATE categories SET operation_id = (
+            SELECT operations.id FROM operations WHERE operations.name = categories.operation_name
+        )
+    """)
+    op.execute("""
+        UPDATE articles SET category_id = COALESCE(
+            (SELECT min(categories.id) FROM categories
+             JOIN operations ON operations.id = categories.operation_id
+             WHERE categories.name = articles.category_name
+               AND operations.name = articles.category_operation),
+            (SELECT min(categories.id) FROM categories WHERE categories.name = articles.category_name)
+        )
+    """)
+
+    op.drop_index("ix_categories_operation_name", table_name="categories")
+    op.drop_index("ix_articles_category_name", table_name="articles")
+    with op.batch_alter_table("categories") as batch:
+        batch.drop_column("operation_name")
+        batch.create_foreign_key("fk_categories_operation_id", "operations", ["operation_id"], ["id"])
+        batch.create_index("ix_categories_operation_id", ["operation_id"])
+    with op.batch_alter_table("articles") as batch:
+        batch.drop_column("category_name")
+        batch.drop_column("category_operation")
+        batch.create_foreign_key("fk_articles_category_id", "categories", ["category_id"], ["id"])
+        batch.create_index("ix_articles_category_id", ["category_id"])
+
+
+def downgrade():
+    with op.batch_alter_table("articles") as batch:
+        batch.add_column(sa.Column("category_name", sa.String()))
+        batch.add_column(sa.Column("category_operation", sa.String(), nullable=False, server_default=""))
+    with op.batch_alter_table("categories") as batch:
+        batch.add_column(sa.Column("operation_name", sa.String()))
+
+    op.execute("""
+        UPDATE categories SET operation_name = (
+            SELECT operations.name FROM operations WHERE operations.id = categories.operation_id
+        )
+    """)
+    op.execute("""
+        UPDATE articles SET
+            category_name = (SELECT categories.name FROM categories WHERE categories.id = articles.category_id),
+            category_operation = COALESCE((
+                SELECT operations.name FROM categories
+                JOIN operations ON operations.id = categories.operation_id
+                WHERE categories.id = articles.category_id
+            ), '')
+    """)
+
+    with op.batch_alter_table("articles") as batch:
+        batch.drop_index("ix_articles_category_id")
+        batch.drop_constraint("fk_articles_category_id", type_="foreignkey")
+        batch.drop_column("category_id")
+        batch.create_foreign_key("fk_articles_category_name", "categories", ["category_name"], ["name"])
+    with op.batch_alter_table("categories") as batch:
+        batch.drop_index("ix_categories_operation_id")
+        batch.drop_constraint("fk_categories_operation_id", type_="foreignkey")
+        batch.drop_column("operation_id")
+        batch.create_foreign_key("fk_categories_operation_name", "operations", ["operation_name"], ["name"])
+    op.create_index("ix_categories_operation_name", "categories", ["operation_name"])
+    op.create_index("ix_articles_category_name", "articles", ["category_name"])
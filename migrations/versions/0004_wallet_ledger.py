@@ -0,0 +1,51 @@
+"""Журнал движений по кошелькам
+
+Журнал заполняется проводками всех существующих операций. Сами балансы не трогаем:
+расхождения, накопившиеся до журнала, покажет python -m utils.check_balances.
+
+Revision ID: 0004_wallet_ledger
+Revises: 0003_directory_integer_keys
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_wallet_ledger"
+down_revision = "0003_directory_integer_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "wallet_ledger",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("wallet_id", sa.Integer(), nullable=False),
+        sa.Column("operation_id", sa.Integer()),
+        sa.Column("amount", sa.Numeric(12, 2), nullable=False),
+        sa.Column("reason", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_wallet_ledger_wallet_id", "wallet_ledger", ["wallet_id"])
+    op.create_index("ix_wallet_ledger_operation_id", "wallet_ledger", ["operation_id"])
+
+    op.execute("""
+        INSERT INTO wallet_ledger (wallet_id, operation_id, amount, reason, created_at)
+        SELECT w.id, o.id, CASE WHEN o.operation_type = 'Расход' THEN -o.amount ELSE o.amount END, 'create', o.timestamp
+        FROM financial_operations o JOIN wallets w ON w.name = o.wallet
+        WHERE o.operation_type <> 'Перемещение'
+        UNION ALL
+        SELECT w.id, o.id, -o.amount, 'create', o.timestamp
+        FROM financial_operations o JOIN wallets w ON w.name = o.wallet_from
+        WHERE o.operation_type = 'Перемещение'
+        UNION ALL
+        SELECT w.id, o.id, o.amount, 'create', o.timestamp
+        FROM financial_operations o JOIN wallets w ON w.name = o.wallet_to
+        WHERE o.operation_type = 'Перемещение'
+    """)
+
+
+def downgrade():
+    op.drop_index("ix_wallet_ledger_operation_id", table_name="wallet_ledger")
+    op.drop_index("ix_wallet_ledger_wallet_id", table_name="wallet_ledger")
+    op.drop_table("wallet_ledger")
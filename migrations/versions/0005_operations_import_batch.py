@@ -0,0 +1,25 @@
+"""Метка пакета массового импорта у операций
+
+Revision ID: 0005_operations_import_batch
+Revises: 0004_wallet_ledger
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_operations_import_batch"
+down_revision = "0004_wallet_ledger"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("financial_operations") as batch:
+        batch.add_column(sa.Column("import_batch", sa.String()))
+        batch.create_index("ix_financial_operations_import_batch", ["import_batch"])
+
+
+def downgrade():
+    with op.batch_alter_table("financial_operations") as batch:
+        batch.drop_index("ix_financial_operations_import_batch")
+        batch.drop_column("import_batch")
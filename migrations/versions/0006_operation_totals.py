@@ -0,0 +1,67 @@
+"""Сводная таблица для отчётов по операциям
+
+Сводка заполняется по всем существующим операциям; дальше её поддерживает приложение.
+
+Revision ID: 0006_operation_totals
+Revises: 0005_operations_import_batch
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_operation_totals"
+down_revision = "0005_operations_import_batch"
+branch_labels = None
+depends_on = None
+
+MONTH = {
+    "sqlite": "date(o.operation_date, 'start of month')",
+    "postgresql": "CAST(date_trunc('month', o.operation_date) AS DATE)",
+}
+
+
+def upgrade():
+    op.create_table(
+        "operation_totals",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("operation_type", sa.String(), nullable=False),
+        sa.Column("accounting_type", sa.String(), nullable=False),
+        sa.Column("account_type", sa.String(), nullable=False),
+        sa.Column("wallet", sa.String(), nullable=False),
+        sa.Column("amount_in", sa.Numeric(14, 2), nullable=False),
+        sa.Column("amount_out", sa.Numeric(14, 2), nullable=False),
+        sa.UniqueConstraint(
+            "month", "operation_type", "accounting_type", "account_type", "wallet",
+            name="uq_operation_totals_key",
+        ),
+    )
+
+    month = MONTH[op.get_bind().dialect.name]
+    op.execute(f"""
+        INSERT INTO operation_totals (month, operation_type, accounting_type, account_type, wallet, amount_in, amount_out)
+        SELECT month, operation_type, accounting_type, account_type, wallet, SUM(amount_in), SUM(amount_out)
+        FROM (
+            SELECT {month} AS month, o.operation_type, COALESCE(o.accounting_type, '') AS accounting_type,
+                   COALESCE(o.account_type, '') AS account_type, COALESCE(o.wallet, '') AS wallet,
+                   CASE WHEN o.operation_type = 'Расход' THEN 0 ELSE o.amount END AS amount_in,
+                   CASE WHEN o.operation_type = 'Расход' THEN o.amount ELSE 0 END AS amount_out
+            FROM financial_operations o
+            WHERE o.operation_type <> 'Перемещение'
+            UNION ALL
+            SELECT {month}, o.operation_type, COALESCE(o.accounting_type, ''), COALESCE(o.account_type, ''),
+                   COALESCE(o.wallet_from, ''), 0, o.amount
+            FROM financial_operations o
+            WHERE o.operation_type = 'Перемещение'
+            UNION ALL
+            SELECT {month}, o.operation_type, COALESCE(o.accounting_type, ''), COALESCE(o.account_type, ''),
+                   COALESCE(o.wallet_to, ''), o.amount, 0
+            FROM financial_operations o
+            WHERE o.operation_type = 'Перемещение'
+        ) movements
+        GROUP BY month, operation_type, accounting_type, account_type, wallet
+    """)
+
+
+def downgrade():
+    op.drop_table("operation_totals")
@@ -0,0 +1,51 @@
+"""Полнотекстовый поиск по операциям
+
+SQLite: таблица FTS5 financial_operations_fts поверх financial_operations. Триггеров нет: FTS5 читает
+свои служебные таблицы до начала записи, и параллельные транзакции с таким триггером получали
+"database is locked". Индекс обновляет приложение (utils/operation_search.py) после записи операции.
+PostgreSQL: GIN-индекс по tsvector того же текста. Выражение должно совпадать с SEARCH_DOCUMENT
+в utils/operation_search.py, иначе планировщик не использует индекс.
+
+Revision ID: 0007_operation_search
+Revises: 0006_operation_totals
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0007_operation_search"
+down_revision = "0006_operation_totals"
+branch_labels = None
+depends_on = None
+
+FTS_COLUMNS = "comment, accounting_type, account_type"
+
+
+def upgrade():
+    op.create_index("ix_financial_operations_operation_date", "financial_operations", ["operation_date"])
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute(f"""
+            CREATE VIRTUAL TABLE financial_operations_fts USING fts5(
+                {FTS_COLUMNS},
+                content='financial_operations', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        op.execute("INSERT INTO financial_operations_fts (financial_operations_fts) VALUES ('rebuild')")
+    elif dialect == "postgresql":
+        op.execute("""
+            CREATE INDEX ix_financial_operations_search ON financial_operations USING gin (
+                to_tsvector('russian', coalesce(comment, '') || ' ' || coalesce(accounting_type, '') || ' ' || coalesce(account_type, ''))
+            )
+        """)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute("DROP TABLE IF EXISTS financial_operations_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_financial_operations_search")
+
+    op.drop_index("ix_financial_operations_operation_date", table_name="financial_operations")
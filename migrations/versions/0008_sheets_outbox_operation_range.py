@@ -0,0 +1,23 @@
+"""Диапазон операций в записи очереди Google Таблицы
+
+Revision ID: 0008_sheets_outbox_operation_range
+Revises: 0007_operation_search
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_sheets_outbox_operation_range"
+down_revision = "0007_operation_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("sheets_outbox") as batch:
+        batch.add_column(sa.Column("last_operation_id", sa.Integer()))
+
+
+def downgrade():
+    with op.batch_alter_table("sheets_outbox") as batch:
+        batch.drop_column("last_operation_id")
@@ -0,0 +1,25 @@
+"""Отзыв токенов веб-пользователей, общий для всех процессов
+
+Revision ID: 0009_token_revocations
+Revises: 0008_sheets_outbox_operation_range
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_token_revocations"
+down_revision = "0008_sheets_outbox_operation_range"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "token_revocations",
+        sa.Column("username", sa.String(), primary_key=True),
+        sa.Column("revoked_at", sa.Float(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("token_revocations")
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Request, Depends, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.security import OAuth2PasswordRequestForm
 import databases
+from services.auth import get_password_hash_stats
 from services.auth_service import login_user, register_user
-from dependencies import get_authenticated_user, get_current_user, get_token_from_cookie
+from dependencies import get_authenticated_user, require_role
 from database import get_db
 
 router = APIRouter()
@@ -45,11 +46,8 @@ async def login(
 @router.get("/welcome", response_class=HTMLResponse)
 @router.get("/", response_class=HTMLResponse)
 async def welcome(request: Request):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
+    # Через get_authenticated_user, чтобы учесть отзывы токенов из других процессов
+    payload = await get_authenticated_user(request)
     if isinstance(payload, RedirectResponse):
         return payload
 
@@ -75,10 +73,7 @@ async def confirm(request: Request, user: dict = Depends(get_authenticated_user)
 
 @router.get("/access", response_class=HTMLResponse)
 async def access(request: Request):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-    payload = get_current_user(token)
+    payload = await get_authenticated_user(request)
     if isinstance(payload, RedirectResponse):
         return payload
     username = payload.get("sub")
@@ -86,3 +81,9 @@ async def access(request: Request):
     return templates.TemplateResponse(
         "access.html", {"request": request, "username": username, "role": role}
     )
+
+
+@router.get("/auth/password_hash_stats", response_class=JSONResponse, dependencies=[Depends(require_role("admin"))])
+async def password_hash_stats():
+    # Нагрузка на пул хеширования паролей этого процесса: число вызовов и время ожидания в очереди
+    return get_password_hash_stats()
@@ -1,24 +1,30 @@
-import os
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional
 import logging
-import gspread
-from sqlalchemy import desc
+from sqlalchemy import and_, desc, or_, select
 from starlette.responses import JSONResponse
 from fastapi import status
 
-from database import TgUser, get_db, PaymentTypes, Operations, Categories, Articles, Wallets, FinancialOperations
+from database import get_db, Wallets, FinancialOperations
 from databases import Database
-from fastapi import FastAPI, Form, Request, APIRouter, Depends, HTTPException
+from fastapi import FastAPI, Form, Request, APIRouter, Depends
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from pytz import timezone
-from dependencies import get_token_from_cookie
+from dependencies import get_token_from_cookie, require_role
 from fastapi.responses import RedirectResponse
 from dotenv import load_dotenv
 
-from utils.wallets import update_wallets_on_google_sheet
+from services.sheets_sync import enqueue_sheet_rows, get_queue_depth
+from utils.directory_cache import get_directory_data
+from utils.operations import parse_date, format_date, format_timestamp, operation_to_dict
+from utils.ledger import operation_wallet_deltas, post_ledger_entries, reverse_ledger_entries
+from utils.operation_totals import apply_operation_totals
+from utils.operation_search import (
+    SEARCH_PAGE_MAX_SIZE, SEARCH_PAGE_SIZE, add_to_search_index, remove_from_search_index,
+    search_conditions, search_facets, search_operations,
+)
 
 load_dotenv()
 
@@ -30,25 +36,41 @@ templates = Jinja2Templates(directory="templates")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Инициализация gspread
-try:
-    gc = gspread.service_account(filename=os.getenv('GOOGLE_TABLES_CREDENTIALS_FILE'))
-    sht2 = gc.open_by_url(
-        os.getenv("GOOGLE_TABLES_URL")
-    )
-    worksheet = sht2.worksheet("Журнал операций")
-    balances_worksheet = sht2.worksheet("Балансы")
-except Exception as e:
-    print(f"Ошибка при инициализации gspread: {str(e)}")
-
 moscow_tz = timezone('Europe/Moscow')
 
-def format_date(date):
-    date_obj = datetime.strptime(date, "%Y-%m-%d").date()
-    return date_obj.strftime("%d.%m.%Y")
-
 from fastapi import Query
 
+OPERATIONS_PAGE_SIZE = 50
+OPERATIONS_PAGE_MAX_SIZE = 200
+
+
+async def fetch_operations_page(db, username, before_id=None, limit=OPERATIONS_PAGE_SIZE):
+    """Страница истории пользователя от новых к старым (keyset-пагинация по (timestamp, id))."""
+    query = FinancialOperations.__table__.select().where(FinancialOperations.username == username)
+
+    if before_id is not None:
+        cursor_timestamp = (
+            select(FinancialOperations.timestamp)
+            .where(FinancialOperations.id == before_id)
+            .scalar_subquery()
+        )
+        query = query.where(
+            or_(
+                FinancialOperations.timestamp < cursor_timestamp,
+                and_(FinancialOperations.timestamp == cursor_timestamp, FinancialOperations.id < before_id),
+            )
+        )
+
+    # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+    rows = await db.fetch_all(
+        query
+        .order_by(desc(FinancialOperations.timestamp), desc(FinancialOperations.id))
+        .limit(limit + 1)
+    )
+    next_before_id = rows[limit - 1].id if len(rows) > limit else None
+    return [operation_to_dict(row) for row in rows[:limit]], next_before_id
+
+
 @router.get("/tg_bot_add", response_class=HTMLResponse)
 async def get_form(
     request: Request,
@@ -60,73 +82,84 @@ async def get_form(
     if isinstance(token, RedirectResponse):
         return token
 
-    users_data = await db.fetch_all(TgUser.__table__.select())
-    payment_types = await db.fetch_all(PaymentTypes.__table__.select())
-    operations = await db.fetch_all(Operations.__table__.select())
-    categories = await db.fetch_all(Categories.__table__.select())
-    articles = await db.fetch_all(Articles.__table__.select())
+    # Справочники берём из кэша; кошельки читаем всегда, их балансы меняются с каждой операцией
+    directory = await get_directory_data(db)
     wallets = await db.fetch_all(Wallets.__table__.select())
-    operations_list = await db.fetch_all(
-        FinancialOperations.__table__
-        .select()
-        .where(FinancialOperations.username == username)
-    )
+    # В шаблон попадает только первая страница истории, остальное подгружается при прокрутке
+    financial_operations, next_before_id = await fetch_operations_page(db, username)
 
-    operations_list.sort(
-        key=lambda x: datetime.strptime(x["timestamp"], "%d.%m.%Y %H:%M:%S"),
-        reverse=True
-    )
-
-    # Преобразуем данные в нужный формат
-    category_articles = {}
-    for article in articles:
-        category_name = article.category_name
-        if category_name not in category_articles:
-            category_articles[category_name] = []
-        category_articles[category_name].append(article.title)
-
-    operation_categories = {}
-    for category in categories:
-        operation_name = category.operation_name
-        if operation_name not in operation_categories:
-            operation_categories[operation_name] = []
-        operation_categories[operation_name].append(category.name)
-
-    financial_operations = [
-        {
-            'id': row.id,
-            'timestamp': row.timestamp,
-            'username': row.username,
-            'operation_date': row.operation_date,
-            'operation_type': row.operation_type,
-            'accounting_type': row.accounting_type,
-            'account_type': row.account_type,
-            'finish_date': row.finish_date,
-            'amount': row.amount,
-            'payment_type': row.payment_type,
-            'comment': row.comment,
-            'wallet': row.wallet,
-            'wallet_from': row.wallet_from,
-            'wallet_to': row.wallet_to
-        }
-        for row in operations_list
-    ]
     return templates.TemplateResponse(
         "bot/form.html",
         {
             "request": request,
-            "users": users_data,
+            "users": directory["users"],
             "username": username,
-            "payment_types": payment_types,
-            "operations": operations,
-            "operation_categories": operation_categories,
-            "category_articles": category_articles,
+            "payment_types": directory["payment_types"],
+            "operations": directory["operations"],
+            "operation_categories": directory["operation_categories"],
+            "category_articles": directory["category_articles"],
             "wallets": wallets,
             "financial_operations": financial_operations,
+            "next_before_id": next_before_id,
         },
     )
 
 
+@router.get("/tg_bot_add/operations", response_class=JSONResponse)
+async def get_operations_page(
+    username: str = Query(...),
+    before_id: Optional[int] = Query(None),
+    limit: int = Query(OPERATIONS_PAGE_SIZE, ge=1, le=OPERATIONS_PAGE_MAX_SIZE),
+    db: Database = Depends(get_db),
+    current_user: dict = Depends(require_role()),
+):
+    operations, next_before_id = await fetch_operations_page(db, username, before_id, limit)
+    return {"operations": operations, "next_before_id": next_before_id}
+
+
+@router.get("/tg_bot_add/operations/search", response_class=JSONResponse)
+async def search_operations_page(
+    q: Optional[str] = Query(None),
+    username: Optional[str] = Query(None),
+    date_from: Optional[str] = Query(None),
+    date_to: Optional[str] = Query(None),
+    amount_min: Optional[Decimal] = Query(None),
+    amount_max: Optional[Decimal] = Query(None),
+    wallet: Optional[str] = Query(None),
+    payment_type: Optional[str] = Query(None),
+    operation_type: Optional[str] = Query(None),
+    before_id: Optional[int] = Query(None),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_PAGE_MAX_SIZE),
+    db: Database = Depends(get_db),
+    current_user: dict = Depends(require_role()),
+):
+    try:
+        date_from = parse_date(date_from) if date_from else None
+        date_to = parse_date(date_to) if date_to else None
+    except ValueError:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"status": "error", "message": "Даты передаются в формате ГГГГ-ММ-ДД"}
+        )
+
+    conditions = search_conditions(
+        db.url.dialect,
+        q=q,
+        username=username,
+        date_from=date_from,
+        date_to=date_to,
+        amount_min=amount_min,
+        amount_max=amount_max,
+        wallet=wallet,
+        payment_type=payment_type,
+        operation_type=operation_type,
+    )
+    operations, next_before_id = await search_operations(db, conditions, before_id, limit)
+    # Фасеты считаются только для первой страницы: при подгрузке следующих они не меняются
+    facets = await search_facets(db, conditions) if before_id is None else None
+    return {"operations": operations, "next_before_id": next_before_id, "facets": facets}
+
+
 @router.post("/submit", response_class=HTMLResponse)
 async def submit_form(
         request: Request,
@@ -145,121 +178,87 @@ async def submit_form(
         db: Database = Depends(get_db),
 ):
     try:
-        current_time = datetime.now(moscow_tz).strftime("%d.%m.%Y %H:%M:%S")
+        current_time = datetime.now(moscow_tz).replace(tzinfo=None)
         username = username.replace("%20", " ")
 
-        # Сначала добавляем данные, потом форматируем только добавленные строки
-        formatted_operation_date = format_date(date)
+        operation_date = parse_date(date)
 
         if operation_type == "Перемещение":
-            formatted_finish_date = ""
+            finish_date = None
         else:
-            formatted_finish_date = format_date(date_finish) if date_finish else ""
+            finish_date = parse_date(date_finish) if date_finish else None
             if operation_type == "Расход":
                 amount = -amount
 
         amount_for_db = abs(int(amount))
 
-        query = FinancialOperations.__table__.insert().values(
-            timestamp=current_time,
-            username=username,
-            operation_date=formatted_operation_date,
-            operation_type=operation_type,
-            accounting_type=accounting_type,
-            account_type=account_type,
-            finish_date=formatted_finish_date,
-            amount=amount_for_db,
-            payment_type=payment_type,
-            comment=comment,
-            wallet=wallet,
-            wallet_from=wallet_from,
-            wallet_to=wallet_to
-        )
-        operation_id = await db.execute(query)
-
-        new_row = [
-            current_time,
-            username,
-            formatted_operation_date,
-            operation_type,
-            accounting_type,
-            account_type,
-            formatted_finish_date,
-            amount,
-            payment_type,
-            comment,
-        ]
-
-        if operation_type == "Перемещение":
-            row_from = new_row.copy()
-            row_from[7] = -abs(row_from[7])
-            row_from.append(wallet_from)
-            row_from.append(operation_id)
-            worksheet.append_row(row_from, value_input_option="USER_ENTERED")
-
-            row_to = new_row.copy()
-            row_to[7] = abs(row_to[7])
-            row_to.append(wallet_to)
-            row_to.append(operation_id)
-            worksheet.append_row(row_to, value_input_option="USER_ENTERED")
-            wallet_from_instance = await db.fetch_one(Wallets.__table__.select().where(Wallets.name == wallet_from))
-            if wallet_from_instance:
-                new_balance = wallet_from_instance.balance - Decimal(amount)
-                query = Wallets.__table__.update().where(Wallets.name == wallet_from).values(balance=new_balance)
-                await db.execute(query)
-            else:
-                raise HTTPException(status_code=404, detail="Wallet not found")
-            wallet_to_instance = await db.fetch_one(Wallets.__table__.select().where(Wallets.name == wallet_to))
-            if wallet_to_instance:
-                new_balance = wallet_to_instance.balance + Decimal(amount)
-                query = Wallets.__table__.update().where(Wallets.name == wallet_to).values(balance=new_balance)
-                await db.execute(query)
-            else:
-                raise HTTPException(status_code=404, detail="Wallet not found")
-        else:
-            new_row.append(wallet)
-            new_row.append(operation_id)
-            worksheet.append_row(new_row, value_input_option="USER_ENTERED")
-            wallet_instance = await db.fetch_one(Wallets.__table__.select().where(Wallets.name == wallet))
-            if wallet_instance:
-                new_balance = wallet_instance.balance + Decimal(amount)
-                query = Wallets.__table__.update().where(Wallets.name == wallet).values(balance=new_balance)
-                await db.execute(query)
+        # Операция, изменения балансов и очередь в Google Таблицу фиксируются одной транзакцией
+        async with db.transaction():
+            query = FinancialOperations.__table__.insert().values(
+                timestamp=current_time,
+                username=username,
+                operation_date=operation_date,
+                operation_type=operation_type,
+                accounting_type=accounting_type,
+                account_type=account_type,
+                finish_date=finish_date,
+                amount=amount_for_db,
+                payment_type=payment_type,
+                comment=comment,
+                wallet=wallet,
+                wallet_from=wallet_from,
+                wallet_to=wallet_to
+            )
+            operation_id = await db.execute(query)
+            await add_to_search_index(db, FinancialOperations.id == operation_id)
+
+            new_row = [
+                format_timestamp(current_time),
+                username,
+                format_date(operation_date),
+                operation_type,
+                accounting_type,
+                account_type,
+                format_date(finish_date),
+                amount,
+                payment_type,
+                comment,
+            ]
+
+            if operation_type == "Перемещение":
+                row_from = new_row.copy()
+                row_from[7] = -abs(row_from[7])
+                row_from.append(wallet_from)
+                row_from.append(operation_id)
+                sheet_rows = [row_from]
+
+                row_to = new_row.copy()
+                row_to[7] = abs(row_to[7])
+                row_to.append(wallet_to)
+                row_to.append(operation_id)
+                sheet_rows.append(row_to)
             else:
-                raise HTTPException(status_code=404, detail="Wallet not found")
-
-        await update_wallets_on_google_sheet(db, balances_worksheet)
-
-        num_rows = len(worksheet.get_all_values())
-        num_cols = len(worksheet.get_all_values()[0]) if num_rows > 0 else 0
-
-        # Форматируем только если столбцы существуют
-        if num_cols >= 1:  # Столбец A
-            worksheet.format(f'A1:A{num_rows}', {
-                "numberFormat": {
-                    "type": "DATE",
-                    "pattern": "dd.mm.yyyy HH:mm:ss"
-                }
+                new_row.append(wallet)
+                new_row.append(operation_id)
+                sheet_rows = [new_row]
+
+            # Балансы меняются через журнал кошельков на сохранённую в базе сумму
+            deltas = operation_wallet_deltas(operation_type, amount_for_db, wallet, wallet_from, wallet_to)
+            await post_ledger_entries(db, operation_id, deltas, "create")
+            await apply_operation_totals(db, {
+                "operation_date": operation_date,
+                "operation_type": operation_type,
+                "accounting_type": accounting_type,
+                "account_type": account_type,
+                "amount": amount_for_db,
+                "wallet": wallet,
+                "wallet_from": wallet_from,
+                "wallet_to": wallet_to,
             })
 
-        if num_cols >= 3:  # Столбец C
-            worksheet.format(f'C1:C{num_rows}', {
-                "numberFormat": {
-                    "type": "DATE",
-                    "pattern": "dd.mm.yyyy"
-                }
-            })
+            await enqueue_sheet_rows(db, operation_id, sheet_rows)
 
-        if num_cols >= 7:  # Столбец G
-            worksheet.format(f'G1:G{num_rows}', {
-                "numberFormat": {
-                    "type": "DATE",
-                    "pattern": "dd.mm.yyyy"
-                }
-            })
-
-        # Вывод в консоль для отладки
-        print(f"\nДобавлена новая запись. Текущий размер таблицы: {num_rows} строк, {num_cols} столбцов")
+        logger.info(f"Добавлена операция id={operation_id}, строки поставлены в очередь для Google Таблицы")
 
         return templates.TemplateResponse(
             "bot/success.html", {"request": request, "message": "Данные успешно добавлены!"}
@@ -292,11 +291,11 @@ async def edit_operation(
     try:
         form_data = {
             "username": username,
-            "operation_date": format_date(date) if date else None,
+            "operation_date": parse_date(date) if date else None,
             "operation_type": operation_type,
             "accounting_type": accounting_type,
             "account_type": account_type,
-            "finish_date": format_date(date_finish) if date_finish else None,
+            "finish_date": parse_date(date_finish) if date_finish else None,
             "amount": abs(int(Decimal(amount))) if amount else None,
             "payment_type": payment_type,
             "comment": comment,
@@ -313,133 +312,91 @@ async def edit_operation(
                 content={"status": "error", "message": "Нет данных для обновления"}
             )
 
-        fin_operation = await db.fetch_one(FinancialOperations.__table__.select().where(FinancialOperations.id == operation_id))
-
-        old_amount = Decimal(fin_operation.amount) if fin_operation.amount else Decimal(0)
-
-        query = (
-            FinancialOperations.__table__
-            .update()
-            .where(FinancialOperations.id == operation_id)
-            .values(**update_data)
-        )
-        await db.execute(query)
+        # Операция, изменения балансов и очередь в Google Таблицу фиксируются одной транзакцией
+        async with db.transaction():
+            fin_operation = await db.fetch_one(FinancialOperations.__table__.select().where(FinancialOperations.id == operation_id))
 
-        select_query = FinancialOperations.__table__.select().where(FinancialOperations.id == operation_id)
-        row = await db.fetch_one(select_query)
+            if not fin_operation:
+                return JSONResponse(
+                    status_code=404,
+                    content={"status": "error", "message": f"Операция с id={operation_id} не найдена"}
+                )
 
-        if not row:
-            return JSONResponse(
-                status_code=404,
-                content={"status": "error", "message": f"Операция с id={operation_id} не найдена"}
+            query = (
+                FinancialOperations.__table__
+                .update()
+                .where(FinancialOperations.id == operation_id)
+                .values(**update_data)
             )
+            await db.execute(query)
+            await remove_from_search_index(db, fin_operation)
+            await add_to_search_index(db, FinancialOperations.id == operation_id)
 
-        now_str = datetime.now(moscow_tz).strftime("%d.%m.%Y %H:%M:%S")
-        amount_decimal = Decimal(row.amount) if row.amount else Decimal(0)
-        operation_type = row.operation_type.lower() if row.operation_type else ""
+            select_query = FinancialOperations.__table__.select().where(FinancialOperations.id == operation_id)
+            row = await db.fetch_one(select_query)
 
-        formatted_operation_date = row.operation_date
-        formatted_finish_date = row.finish_date if row.finish_date and operation_type != "перемещение" else ""
+            now_str = format_timestamp(datetime.now(moscow_tz))
+            amount_decimal = row.amount or Decimal(0)
+            operation_type = row.operation_type.lower() if row.operation_type else ""
 
-        if operation_type == "расход":
-            amount_for_sheet = -abs(int(amount_decimal))
-        elif operation_type == "приход":
-            amount_for_sheet = abs(int(amount_decimal))
-        else:
-            amount_for_sheet = int(amount_decimal)
-
-        row_data = [
-            now_str,
-            row.username,
-            formatted_operation_date,
-            row.operation_type,
-            row.accounting_type,
-            row.account_type,
-            formatted_finish_date,
-            amount_for_sheet,
-            row.payment_type,
-            row.comment,
-        ]
-
-        if operation_type == "перемещение":
-            row_data.append(row.wallet_from)
-            row_data[7] = -abs(int(amount_decimal))
-            row_data.append(operation_id)
-            worksheet.append_row(row_data, value_input_option="USER_ENTERED")
-
-            row_data[-2] = row.wallet_to
-            row_data[7] = abs(int(amount_decimal))
-            row_data[-1] = operation_id
-            worksheet.append_row(row_data, value_input_option="USER_ENTERED")
-
-            wallet_from_instance = await db.fetch_one(Wallets.__table__.select().where(Wallets.name == row.wallet_from))
-            if wallet_from_instance:
-                new_balance = wallet_from_instance.balance + old_amount - amount_decimal
-                query = Wallets.__table__.update().where(Wallets.name == row.wallet_from).values(balance=new_balance)
-                await db.execute(query)
-            else:
-                raise HTTPException(status_code=404, detail=f"Wallet from {row.wallet_from} not found")
+            formatted_operation_date = format_date(row.operation_date)
+            formatted_finish_date = format_date(row.finish_date) if operation_type != "перемещение" else ""
 
-            wallet_to_instance = await db.fetch_one(Wallets.__table__.select().where(Wallets.name == row.wallet_to))
-            if wallet_to_instance:
-                new_balance = wallet_to_instance.balance - old_amount + amount_decimal
-                query = Wallets.__table__.update().where(Wallets.name == row.wallet_to).values(balance=new_balance)
-                await db.execute(query)
+            if operation_type == "расход":
+                amount_for_sheet = -abs(int(amount_decimal))
+            elif operation_type == "приход":
+                amount_for_sheet = abs(int(amount_decimal))
             else:
-                raise HTTPException(status_code=404, detail="Wallet to not found")
-        else:
-            row_data.append(row.wallet)
-            row_data.append(operation_id)
-            worksheet.append_row(row_data, value_input_option="USER_ENTERED")
-
-            wallet_instance = await db.fetch_one(Wallets.__table__.select().where(Wallets.name == row.wallet))
-            if wallet_instance:
-                if operation_type == "приход":
-                    new_balance_amount = amount_for_sheet - old_amount
-                else:
-                    new_balance_amount = old_amount - abs(amount_for_sheet)
-                new_balance = wallet_instance.balance + new_balance_amount
-                query = Wallets.__table__.update().where(Wallets.name == row.wallet).values(balance=new_balance)
-                await db.execute(query)
+                amount_for_sheet = int(amount_decimal)
+
+            row_data = [
+                now_str,
+                row.username,
+                formatted_operation_date,
+                row.operation_type,
+                row.accounting_type,
+                row.account_type,
+                formatted_finish_date,
+                amount_for_sheet,
+                row.payment_type,
+                row.comment,
+            ]
+
+            if operation_type == "перемещение":
+                row_data.append(row.wallet_from)
+                row_data[7] = -abs(int(amount_decimal))
+                row_data.append(operation_id)
+                sheet_rows = [row_data.copy()]
+
+                row_data[-2] = row.wallet_to
+                row_data[7] = abs(int(amount_decimal))
+                row_data[-1] = operation_id
+                sheet_rows.append(row_data)
             else:
-                raise HTTPException(status_code=404, detail="Wallet not found")
-
-        await update_wallets_on_google_sheet(db, balances_worksheet)
-
-        num_rows = len(worksheet.get_all_values())
-        num_cols = len(worksheet.get_all_values()[0]) if num_rows > 0 else 0
-
-        if num_cols >= 1:
-            worksheet.format(f'A1:A{num_rows}', {
-                "numberFormat": {
-                    "type": "DATE",
-                    "pattern": "dd.mm.yyyy HH:mm:ss"
-                }
-            })
-
-        if num_cols >= 3:
-            worksheet.format(f'C1:C{num_rows}', {
-                "numberFormat": {
-                    "type": "DATE",
-                    "pattern": "dd.mm.yyyy"
-                }
-            })
+                row_data.append(row.wallet)
+                row_data.append(operation_id)
+                sheet_rows = [row_data]
+
+            # Сторнируем прежнее влияние операции на балансы и проводим её заново:
+            # так смена типа, суммы или кошелька не накапливает расхождений
+            await reverse_ledger_entries(db, operation_id, "edit")
+            deltas = operation_wallet_deltas(
+                row.operation_type, row.amount, row.wallet, row.wallet_from, row.wallet_to
+            )
+            await post_ledger_entries(db, operation_id, deltas, "edit")
+            # Сводку для отчётов правим так же: убираем прежнюю версию операции и добавляем новую
+            await apply_operation_totals(db, fin_operation, -1)
+            await apply_operation_totals(db, row)
 
-        if num_cols >= 7:
-            worksheet.format(f'G1:G{num_rows}', {
-                "numberFormat": {
-                    "type": "DATE",
-                    "pattern": "dd.mm.yyyy"
-                }
-            })
+            await enqueue_sheet_rows(db, operation_id, sheet_rows)
 
-        print(f"\nОбновлена запись с id={operation_id}. Текущий размер таблицы: {num_rows} строк, {num_cols} столбцов")
+        logger.info(f"Обновлена операция id={operation_id}, строки поставлены в очередь для Google Таблицы")
 
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content={
                 "status": "success",
-                "message": "Запись обновлена и добавлена в Google Таблицу",
+                "message": "Запись обновлена и поставлена в очередь для Google Таблицы",
                 "updated_fields": list(update_data.keys())
             }
         )
@@ -457,139 +414,77 @@ async def delete_operation(
     db: Database = Depends(get_db),
 ):
     try:
-        select_query = FinancialOperations.__table__.select().where(FinancialOperations.id == operation_id)
-        row = await db.fetch_one(select_query)
-
-        if not row:
-            return JSONResponse(
-                status_code=status.HTTP_404_NOT_FOUND,
-                content={"status": "error", "message": f"Операция с id={operation_id} не найдена"}
-            )
+        # Удаление, возврат балансов и очередь в Google Таблицу фиксируются одной транзакцией
+        async with db.transaction():
+            select_query = FinancialOperations.__table__.select().where(FinancialOperations.id == operation_id)
+            row = await db.fetch_one(select_query)
+
+            if not row:
+                return JSONResponse(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    content={"status": "error", "message": f"Операция с id={operation_id} не найдена"}
+                )
 
-        now_str = datetime.now(moscow_tz).strftime("%d.%m.%Y %H:%M:%S")
-        amount_decimal = Decimal(row.amount) if row.amount else Decimal(0)
-        original_operation_type = row.operation_type.lower() if row.operation_type else ""
+            now_str = format_timestamp(datetime.now(moscow_tz))
+            amount_decimal = row.amount or Decimal(0)
+            original_operation_type = row.operation_type.lower() if row.operation_type else ""
 
-        formatted_operation_date = row.operation_date
-        formatted_finish_date = row.finish_date if row.finish_date and original_operation_type != "перемещение" else ""
+            formatted_operation_date = format_date(row.operation_date)
+            formatted_finish_date = format_date(row.finish_date) if original_operation_type != "перемещение" else ""
 
-        if original_operation_type == "расход":
-            amount_for_sheet = -abs(int(amount_decimal))
-        elif original_operation_type == "приход":
-            amount_for_sheet = abs(int(amount_decimal))
-        else:
-            amount_for_sheet = int(amount_decimal)
-
-        row_data = [
-            now_str,
-            row.username,
-            formatted_operation_date,
-            "УДАЛЕНО",
-            row.accounting_type,
-            row.account_type,
-            formatted_finish_date,
-            amount_for_sheet,
-            row.payment_type,
-            row.comment,
-        ]
-
-        if original_operation_type == "перемещение":
-            row_data.append(row.wallet_from)
-            row_data[7] = -abs(int(amount_decimal))
-            row_data.append(operation_id)
-            worksheet.append_row(row_data, value_input_option="USER_ENTERED")
-
-            row_data[-2] = row.wallet_to
-            row_data[7] = abs(int(amount_decimal))
-            row_data[-1] = operation_id
-            worksheet.append_row(row_data, value_input_option="USER_ENTERED")
-        else:
-            # row.wallet может быть NULL в базе (старые/битые записи) — в таблицу пишем пусто
-            row_data.append(row.wallet or "")
-            row_data.append(operation_id)
-            worksheet.append_row(row_data, value_input_option="USER_ENTERED")
-
-        # Балансы корректируем только если нужные кошельки указаны
-        if original_operation_type in ("расход", "приход") and not row.wallet:
-            logger.warning(f"Удаление operation_id {operation_id}: wallet is None for type={original_operation_type}, skip balance update")
-        elif original_operation_type == "расход":
-            wallet_instance = await db.fetch_one(Wallets.__table__.select().where(Wallets.name == row.wallet))
-            if wallet_instance:
-                new_balance = wallet_instance.balance + amount_decimal
-                query = Wallets.__table__.update().where(Wallets.name == row.wallet).values(balance=new_balance)
-                await db.execute(query)
+            if original_operation_type == "расход":
+                amount_for_sheet = -abs(int(amount_decimal))
+            elif original_operation_type == "приход":
+                amount_for_sheet = abs(int(amount_decimal))
             else:
-                raise HTTPException(status_code=404, detail=f"Wallet {row.wallet} not found")
-        elif original_operation_type == "приход":
-            wallet_instance = await db.fetch_one(Wallets.__table__.select().where(Wallets.name == row.wallet))
-            if wallet_instance:
-                new_balance = wallet_instance.balance - amount_decimal
-                query = Wallets.__table__.update().where(Wallets.name == row.wallet).values(balance=new_balance)
-                await db.execute(query)
-            else:
-                raise HTTPException(status_code=404, detail=f"Wallet {row.wallet} not found")
-        elif original_operation_type == "перемещение":
-            if not row.wallet_from or not row.wallet_to:
-                logger.warning(
-                    f"Удаление operation_id {operation_id}: wallet_from/wallet_to is None for transfer, skip balance update "
-                    f"(wallet_from={row.wallet_from}, wallet_to={row.wallet_to})"
-                )
+                amount_for_sheet = int(amount_decimal)
+
+            row_data = [
+                now_str,
+                row.username,
+                formatted_operation_date,
+                "УДАЛЕНО",
+                row.accounting_type,
+                row.account_type,
+                formatted_finish_date,
+                amount_for_sheet,
+                row.payment_type,
+                row.comment,
+            ]
+
+            if original_operation_type == "перемещение":
+                row_data.append(row.wallet_from)
+                row_data[7] = -abs(int(amount_decimal))
+                row_data.append(operation_id)
+                sheet_rows = [row_data.copy()]
+
+                row_data[-2] = row.wallet_to
+                row_data[7] = abs(int(amount_decimal))
+                row_data[-1] = operation_id
+                sheet_rows.append(row_data)
             else:
-                wallet_from_instance = await db.fetch_one(Wallets.__table__.select().where(Wallets.name == row.wallet_from))
-                if wallet_from_instance:
-                    new_balance = wallet_from_instance.balance + amount_decimal
-                    query = Wallets.__table__.update().where(Wallets.name == row.wallet_from).values(balance=new_balance)
-                    await db.execute(query)
-                else:
-                    raise HTTPException(status_code=404, detail=f"Wallet from {row.wallet_from} not found")
-
-                wallet_to_instance = await db.fetch_one(Wallets.__table__.select().where(Wallets.name == row.wallet_to))
-                if wallet_to_instance:
-                    new_balance = wallet_to_instance.balance - amount_decimal
-                    query = Wallets.__table__.update().where(Wallets.name == row.wallet_to).values(balance=new_balance)
-                    await db.execute(query)
-                else:
-                    raise HTTPException(status_code=404, detail=f"Wallet to {row.wallet_to} not found")
-
-        num_rows = len(worksheet.get_all_values())
-        num_cols = len(worksheet.get_all_values()[0]) if num_rows > 0 else 0
-
-        await update_wallets_on_google_sheet(db, balances_worksheet)
-
-        if num_cols >= 1:
-            worksheet.format(f'A1:A{num_rows}', {
-                "numberFormat": {
-                    "type": "DATE",
-                    "pattern": "dd.mm.yyyy HH:mm:ss"
-                }
-            })
+                # row.wallet может быть NULL в базе (старые/битые записи) — в таблицу пишем пусто
+                row_data.append(row.wallet or "")
+                row_data.append(operation_id)
+                sheet_rows = [row_data]
 
-        if num_cols >= 3:
-            worksheet.format(f'C1:C{num_rows}', {
-                "numberFormat": {
-                    "type": "DATE",
-                    "pattern": "dd.mm.yyyy"
-                }
-            })
+            # Возвращаем балансы ровно на то, что операция в них внесла
+            await reverse_ledger_entries(db, operation_id, "delete")
+            await apply_operation_totals(db, row, -1)
 
-        if num_cols >= 7:
-            worksheet.format(f'G1:G{num_rows}', {
-                "numberFormat": {
-                    "type": "DATE",
-                    "pattern": "dd.mm.yyyy"
-                }
-            })
+            delete_query = FinancialOperations.__table__.delete().where(FinancialOperations.id == operation_id)
+            await db.execute(delete_query)
+            await remove_from_search_index(db, row)
 
-        delete_query = FinancialOperations.__table__.delete().where(FinancialOperations.id == operation_id)
-        await db.execute(delete_query)
+            await enqueue_sheet_rows(db, operation_id, sheet_rows)
 
-        print(f"\nУдалена запись с id={operation_id}. Текущий размер таблицы: {num_rows} строк, {num_cols} столбцов")
+        logger.info(f"Удалена операция id={operation_id}, строки поставлены в очередь для Google Таблицы")
 
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content={
                 "status": "success",
-                "message": "Операция удалена из базы данных и добавлена в Google Таблицу с типом 'УДАЛЕНО'"
+                "message": "Операция удалена из базы данных и поставлена в очередь для Google Таблицы с типом 'УДАЛЕНО'"
             }
         )
 
@@ -600,4 +495,9 @@ async def delete_operation(
             content={"status": "error", "message": str(e)}
         )
 
+@router.get("/sheets_sync/status", response_class=JSONResponse, dependencies=[Depends(require_role("admin"))])
+async def sheets_sync_status(db: Database = Depends(get_db)):
+    # Глубина очереди в Google Таблицу и возраст самой старой записи
+    return await get_queue_depth(db)
+
 app.include_router(router)
@@ -0,0 +1,27 @@
+import hmac
+
+from fastapi import APIRouter, Request, Header
+from fastapi.responses import JSONResponse
+
+from services.bot_webhook import BOT_WEBHOOK_SECRET, enqueue_update, is_webhook_enabled
+
+router = APIRouter()
+
+
+@router.post("/tg_bot/webhook")
+async def telegram_webhook(
+        request: Request,
+        x_telegram_bot_api_secret_token: str = Header(default="")
+):
+    if not is_webhook_enabled():
+        return JSONResponse({"detail": "Webhook mode is disabled"}, status_code=404)
+
+    # Telegram передаёт секрет, указанный в setWebhook, в заголовке каждого запроса
+    if not hmac.compare_digest(x_telegram_bot_api_secret_token, BOT_WEBHOOK_SECRET or ""):
+        return JSONResponse({"detail": "Invalid secret token"}, status_code=403)
+
+    # Отвечаем сразу: обновление обрабатывается фоновыми задачами из очереди
+    if not enqueue_update(await request.json()):
+        return JSONResponse({"detail": "Update queue is full"}, status_code=503)
+
+    return JSONResponse({"ok": True})
@@ -1,7 +1,9 @@
 import logging
 
 from database import Articles, Operations, Categories, get_db
-from dependencies import get_token_from_cookie, get_current_user
+from dependencies import require_role
+from utils.directory_cache import invalidate_directory_cache
+from utils.directory_tree import fetch_directory_tree
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
 from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
@@ -21,31 +23,33 @@ logger = logging.getLogger(__name__)
 
 
 @router.get("/articles/")
-async def get_articles(request: Request, db: AsyncSession = Depends(get_db)):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
+async def get_articles(
+        request: Request,
+        db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
+):
     try:
-        articles = await db.fetch_all(Articles.__table__.select())
-        categories = await db.fetch_all(Categories.__table__.select())
-        operations = await db.fetch_all(Operations.__table__.select())
-
-        # Преобразуем данные в нужный формат
-        operation_categories = {}
-        for category in categories:
-            operation_name = category.operation_name
-            if operation_name not in operation_categories:
-                operation_categories[operation_name] = []
-            operation_categories[operation_name].append(category.name)
+        # Категорию и операцию контрагента подтягиваем по id
+        articles = await db.fetch_all(
+            select(Articles.id, Articles.title, Articles.category_id,
+                   Categories.name.label("category_name"),
+                   Operations.name.label("category_operation"))
+            .select_from(
+                Articles.__table__
+                .outerjoin(Categories.__table__, Articles.category_id == Categories.id)
+                .outerjoin(Operations.__table__, Categories.operation_id == Operations.id)
+            )
+            .order_by(Articles.id)
+        )
+        tree = await fetch_directory_tree(db)
+        operations = [{"id": operation["id"], "name": operation["name"]} for operation in tree]
+
+        # id операции -> её категории, для выбора категории в форме
+        operation_categories = {
+            operation["id"]: [{"id": category["id"], "name": category["name"]}
+                              for category in operation["categories"]]
+            for operation in tree
+        }
     except Exception as e:
         logger.error(f"Error fetching articles or categories: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -62,19 +66,8 @@ async def delete_article(
         id: int,
         request: Request,
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return JSONResponse({"detail": "Access denied"}, status_code=403)
-
     try:
         stmt = select(Articles).where(Articles.id == id)
         result = await db.execute(stmt)
@@ -83,6 +76,7 @@ async def delete_article(
         if article:
             await db.delete(article)
             await db.commit()
+            await invalidate_directory_cache(db)
             return JSONResponse({"detail": "Article deleted successfully"})
         return JSONResponse({"detail": "Article not found"}, status_code=404)
     except Exception as e:
@@ -95,22 +89,10 @@ async def update_article(
         request: Request,
         id: int,
         title: str = Form(...),
-        category_name: str = Form(...),
-        category_operation: str = Form(...),
+        category_id: int = Form(...),
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    user_role = payload.get("role")
-    if user_role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
 
     try:
         article = await db.fetch_one(Articles.__table__.select().where(Articles.id == id))
@@ -121,11 +103,10 @@ async def update_article(
         query = (
             update(Articles.__table__)
             .where(Articles.id == id)
-            .values(title=title,
-                    category_name=category_name,
-                    category_operation=category_operation)
+            .values(title=title, category_id=category_id)
         )
         await db.execute(query)
+        await invalidate_directory_cache(db)
     except Exception as e:
         logger.error(f"Error updating article: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -137,31 +118,16 @@ async def update_article(
 async def add_article(
         request: Request,
         title: str = Form(...),
-        category_name: str = Form(...),
-        category_operation: str = Form(...),
+        category_id: int = Form(...),
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     try:
-        article = Articles(title=title,
-                           category_name=category_name,
-                           category_operation=category_operation)
-
-        query = Articles.__table__.insert().values(title=title,
-                                                   category_name=category_name,
-                                                   category_operation=category_operation
-                                                   )
+        article = Articles(title=title, category_id=category_id)
+
+        query = Articles.__table__.insert().values(title=title, category_id=category_id)
         await db.execute(query)
+        await invalidate_directory_cache(db)
         logger.info(f"Article added successfully: {article}")
     except Exception as e:
         logger.error(f"Error adding article: {e}")
@@ -176,21 +142,12 @@ async def delete_article_post(
         id: int,
         request: Request,
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     try:
         query = Articles.__table__.delete().where(Articles.id == id)
         await db.execute(query)
+        await invalidate_directory_cache(db)
     except Exception as e:
         logger.error(f"Error deleting article: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -1,7 +1,8 @@
 import logging
 
 from database import Categories, Operations, get_db
-from dependencies import get_token_from_cookie, get_current_user
+from dependencies import require_role
+from utils.directory_cache import invalidate_directory_cache
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
 from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
@@ -21,22 +22,22 @@ logger = logging.getLogger(__name__)
 
 
 @router.get("/categories/")
-async def get_categories(request: Request, db: AsyncSession = Depends(get_db)):
+async def get_categories(
+        request: Request,
+        db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
+):
     logger.info("checking")
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
 
     try:
-        categories = await db.fetch_all(Categories.__table__.select())
+        # Название операции подтягиваем по operation_id
+        categories = await db.fetch_all(
+            select(Categories.id, Categories.name, Categories.operation_id,
+                   Operations.name.label("operation_name"))
+            .select_from(Categories.__table__.outerjoin(Operations.__table__,
+                                                        Categories.operation_id == Operations.id))
+            .order_by(Categories.id)
+        )
         operations = await db.fetch_all(Operations.__table__.select())
     except Exception as e:
         logger.error(f"Error fetching categories: {e}")
@@ -50,19 +51,8 @@ async def delete_category(
         id: int,
         request: Request,
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return JSONResponse({"detail": "Access denied"}, status_code=403)
-
     try:
         stmt = select(Categories).where(Categories.id == id)
         result = await db.execute(stmt)
@@ -71,6 +61,7 @@ async def delete_category(
         if category:
             await db.delete(category)
             await db.commit()
+            await invalidate_directory_cache(db)
             return JSONResponse({"detail": "Category deleted successfully"})
         return JSONResponse({"detail": "Category not found"}, status_code=404)
     except Exception as e:
@@ -83,21 +74,10 @@ async def update_category(
         request: Request,
         id: int,
         name: str = Form(...),
-        operation_name: str = Form(...),
+        operation_id: int = Form(...),
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    user_role = payload.get("role")
-    if user_role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     try:
         # Check if the category exists
         category = await db.fetch_one(Categories.__table__.select().where(Categories.id == id))
@@ -108,9 +88,10 @@ async def update_category(
         query = (
             update(Categories.__table__)
             .where(Categories.id == id)
-            .values(name=name, operation_name=operation_name)
+            .values(name=name, operation_id=operation_id)
         )
         await db.execute(query)
+        await invalidate_directory_cache(db)
     except Exception as e:
         logger.error(f"Error updating category: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -122,24 +103,15 @@ async def update_category(
 async def add_category(
         request: Request,
         name: str = Form(...),
-        operation_name: str = Form(...),
+        operation_id: int = Form(...),
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     try:
-        category = Categories(name=name, operation_name=operation_name)  # Do not set the id manually
-        query = Categories.__table__.insert().values(name=name, operation_name=operation_name)
+        category = Categories(name=name, operation_id=operation_id)  # Do not set the id manually
+        query = Categories.__table__.insert().values(name=name, operation_id=operation_id)
         await db.execute(query)
+        await invalidate_directory_cache(db)
         logger.info(f"Category added successfully: {category}")
     except Exception as e:
         logger.error(f"Error adding category: {e}")
@@ -154,21 +126,12 @@ async def delete_category_post(
         id: int,
         request: Request,
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     try:
         query = Categories.__table__.delete().where(Categories.id == id)
         await db.execute(query)
+        await invalidate_directory_cache(db)
     except Exception as e:
         logger.error(f"Error deleting category: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -1,7 +1,8 @@
 import logging
 
 from database import Operations, get_db
-from dependencies import get_token_from_cookie, get_current_user
+from dependencies import require_role
+from utils.directory_cache import invalidate_directory_cache
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
 from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
@@ -20,19 +21,11 @@ logger = logging.getLogger(__name__)
 
 
 @router.get("/operations/")
-async def get_operations(request: Request, db: AsyncSession = Depends(get_db)):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
+async def get_operations(
+        request: Request,
+        db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
+):
     operations = await db.fetch_all(Operations.__table__.select())
     return templates.TemplateResponse("operations.html", {"request": request, "operations": operations})
 
@@ -42,22 +35,12 @@ async def delete_operations(
         id: int,
         request: Request,
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return JSONResponse({"detail": "Access denied"}, status_code=403)
-
     # Удаляем пользователя
     query = Operations.__table__.delete().where(Operations.id == id)
     result = await db.execute(query)
+    await invalidate_directory_cache(db)
 
     if result:
         return JSONResponse({"detail": "Operation deleted successfully"})
@@ -70,21 +53,10 @@ async def update_operations(
         id: int,
         name: str = Form(...),
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
     logger.info("checking")
 
-    role = payload.get("role")
-    if role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     try:
         # Проверяем, существует способ оплаты
         operation = await db.fetch_one(Operations.__table__.select().where(Operations.id == id))
@@ -98,6 +70,7 @@ async def update_operations(
             .values(name=name)
         )
         await db.execute(query)
+        await invalidate_directory_cache(db)
     except Exception as e:
         logger.error(f"Error updating operations: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -110,22 +83,13 @@ async def add_operation(
         request: Request,
         name: str = Form(...),
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     try:
         operations = Operations(name=name)  # Do not set the id manually
         query = Operations.__table__.insert().values(name=name)
         await db.execute(query)
+        await invalidate_directory_cache(db)
         logger.info(f"Oeration added successfully: {operations}")
     except Exception as e:
         logger.error(f"Error adding operation: {e}")
@@ -140,20 +104,11 @@ async def delete_operation_post(
         id: int,
         request: Request,
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     # Удаляем пользователя
     query = Operations.__table__.delete().where(Operations.id == id)
     await db.execute(query)
+    await invalidate_directory_cache(db)
 
     return RedirectResponse(url="/operations/", status_code=303)
@@ -1,7 +1,8 @@
 import logging
 
 from database import PaymentTypes, get_db
-from dependencies import get_token_from_cookie, get_current_user
+from dependencies import require_role
+from utils.directory_cache import invalidate_directory_cache
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
 from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
@@ -21,19 +22,11 @@ logger = logging.getLogger(__name__)
 
 
 @router.get("/payment_types/")
-async def get_payment_types(request: Request, db: AsyncSession = Depends(get_db)):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
+async def get_payment_types(
+        request: Request,
+        db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
+):
     try:
         payment_types = await db.fetch_all(PaymentTypes.__table__.select())
     except Exception as e:
@@ -48,19 +41,8 @@ async def delete_payment_type(
         id: int,
         request: Request,
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return JSONResponse({"detail": "Access denied"}, status_code=403)
-
     try:
         stmt = select(Payment_types).where(Payment_types.id == id)
         result = await db.execute(stmt)
@@ -69,6 +51,7 @@ async def delete_payment_type(
         if payment_type:
             await db.delete(payment_type)
             await db.commit()
+            await invalidate_directory_cache(db)
             return JSONResponse({"detail": "Payment type deleted successfully"})
         return JSONResponse({"detail": "Payment type not found"}, status_code=404)
     except Exception as e:
@@ -82,19 +65,8 @@ async def update_payment_type(
         id: int,
         name: str = Form(...),
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    user_role = payload.get("role")
-    if user_role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     try:
         # Проверяем, существует способ оплаты
         payment_type = await db.fetch_one(PaymentTypes.__table__.select().where(PaymentTypes.id == id))
@@ -108,6 +80,7 @@ async def update_payment_type(
             .values(name=name)
         )
         await db.execute(query)
+        await invalidate_directory_cache(db)
     except Exception as e:
         logger.error(f"Error updating payment type: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -120,22 +93,13 @@ async def add_payment_type(
         request: Request,
         name: str = Form(...),
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     try:
         payment_types = PaymentTypes(name=name)  # Do not set the id manually
         query = PaymentTypes.__table__.insert().values(name=name)
         await db.execute(query)
+        await invalidate_directory_cache(db)
         logger.info(f"Payment type added successfully: {payment_types}")
     except Exception as e:
         logger.error(f"Error adding payment type: {e}")
@@ -150,21 +114,12 @@ async def delete_payment_type_post(
         id: int,
         request: Request,
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     try:
         query = PaymentTypes.__table__.delete().where(PaymentTypes.id == id)
         await db.execute(query)
+        await invalidate_directory_cache(db)
     except Exception as e:
         logger.error(f"Error deleting payment type: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -1,7 +1,7 @@
 import logging
 
 from database import Wallets, WebUser, get_db
-from dependencies import get_token_from_cookie, get_current_user
+from dependencies import require_role
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
 from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
@@ -20,19 +20,11 @@ logger = logging.getLogger(__name__)
 
 
 @router.get("/wallets/")
-async def get_wallets(request: Request, db: AsyncSession = Depends(get_db)):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
+async def get_wallets(
+        request: Request,
+        db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
+):
     wallets = await db.fetch_all(Wallets.__table__.select())
     users = await db.fetch_all(WebUser.__table__.select())
     return templates.TemplateResponse("wallets.html", {"request": request, "wallets": wallets, "users": users})
@@ -43,19 +35,8 @@ async def delete_wallet(
         id: int,
         request: Request,
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return JSONResponse({"detail": "Access denied"}, status_code=403)
-
     query = Wallets.__table__.delete().where(Wallets.id == id)
     result = await db.execute(query)
 
@@ -71,21 +52,10 @@ async def update_wallet(
         name: str = Form(...),
         username: str = Form(...),
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
     logger.info("checking")
 
-    role = payload.get("role")
-    if role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     try:
         wallet = await db.fetch_one(Wallets.__table__.select().where(Wallets.id == id))
         if not wallet:
@@ -110,18 +80,8 @@ async def add_wallet(
         name: str = Form(...),
         username: str = Form(...),
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     try:
         query = Wallets.__table__.insert().values(name=name, username=username, balance=0)
         await db.execute(query)
@@ -139,18 +99,8 @@ async def delete_wallet_post(
         id: int,
         request: Request,
         db: AsyncSession = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     query = Wallets.__table__.delete().where(Wallets.id == id)
     await db.execute(query)
 
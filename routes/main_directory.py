@@ -1,8 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi import Request
 
+from dependencies import require_role
+from utils.directory_cache import get_directory_cache_stats
+
 router = APIRouter()
 
 templates = Jinja2Templates(directory="templates")
@@ -16,3 +19,9 @@ async def directory(request: Request):
             "request": request,
         },
     )
+
+
+@router.get("/directory/cache_stats", response_class=JSONResponse, dependencies=[Depends(require_role("admin"))])
+async def directory_cache_stats():
+    # Счётчики попаданий/промахов кэша справочников этого процесса
+    return get_directory_cache_stats()
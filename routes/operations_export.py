@@ -0,0 +1,37 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from database import database
+from dependencies import require_role
+from services.operation_export import export_query, iter_csv, iter_xlsx
+
+router = APIRouter()
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+@router.get("/operations/export")
+async def export_operations(
+        format: str = Query("csv", pattern="^(csv|xlsx)$"),
+        username: Optional[str] = Query(None),
+        date_from: Optional[date] = Query(None),
+        date_to: Optional[date] = Query(None),
+        wallet: Optional[str] = Query(None),
+        operation_type: Optional[str] = Query(None),
+        current_user: dict = Depends(require_role("admin"))
+):
+    query = export_query(username, date_from, date_to, wallet, operation_type)
+    # Строки читаются уже после выхода из обработчика, поэтому берём общий пул,
+    # а не соединение из get_db: зависимость закрывается до начала отправки ответа
+    rows = iter_xlsx(database, query) if format == "xlsx" else iter_csv(database, query)
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="operations.{format}"'},
+    )
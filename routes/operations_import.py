@@ -0,0 +1,29 @@
+from databases import Database
+from fastapi import APIRouter, Depends, File, UploadFile
+from fastapi.responses import JSONResponse
+
+from database import get_db
+from dependencies import require_role
+from services.operation_import import ImportValidationError, import_operations, parse_records
+
+router = APIRouter()
+
+
+@router.post("/operations/import")
+async def import_operations_file(
+        file: UploadFile = File(...),
+        db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin"))
+):
+    try:
+        records = parse_records(await file.read(), file.filename or "")
+    except (ValueError, UnicodeDecodeError) as e:
+        return JSONResponse({"detail": f"Не удалось прочитать файл: {e}"}, status_code=400)
+
+    try:
+        operation_ids = await import_operations(db, records)
+    except ImportValidationError as e:
+        # Ничего не сохранено: файл нужно исправить и загрузить целиком заново
+        return JSONResponse({"detail": str(e), "errors": e.errors}, status_code=400)
+
+    return JSONResponse({"imported": len(operation_ids), "operation_ids": operation_ids})
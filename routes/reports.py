@@ -0,0 +1,51 @@
+from datetime import date
+from typing import Optional
+
+from databases import Database
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from database import get_db
+from dependencies import require_role
+from utils.operation_totals import REPORT_DIMENSIONS, totals_report_query
+
+router = APIRouter()
+
+# Сводка хранит суммы по месяцам, поэтому и границы отчёта задаются месяцами
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+def parse_month(value: str) -> date:
+    year, month = value.split("-")
+    return date(int(year), int(month), 1)
+
+
+@router.get("/reports/totals")
+async def get_operation_totals(
+        group_by: str = Query("month", description="через запятую: month, accounting_type, account_type, wallet"),
+        date_from: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="первый месяц отчёта, ГГГГ-ММ"),
+        date_to: Optional[str] = Query(None, pattern=MONTH_PATTERN, description="последний месяц отчёта (включительно), ГГГГ-ММ"),
+        operation_type: Optional[str] = Query(None),
+        wallet: Optional[str] = Query(None),
+        db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin"))
+):
+    dimensions = [name.strip() for name in group_by.split(",") if name.strip()]
+    unknown = set(dimensions) - set(REPORT_DIMENSIONS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by: {', '.join(sorted(unknown))}")
+
+    month_from = parse_month(date_from) if date_from else None
+    month_to = parse_month(date_to) if date_to else None
+
+    # Отчёт строится по сводке operation_totals, а не по всему журналу операций
+    rows = await db.fetch_all(totals_report_query(dimensions, month_from, month_to, operation_type, wallet))
+    totals = []
+    for row in rows:
+        item = {"operation_type": row.operation_type}
+        for name in dimensions:
+            item[name] = row[name].strftime("%Y-%m") if name == "month" else row[name]
+        item["amount_in"] = float(row.amount_in)
+        item["amount_out"] = float(row.amount_out)
+        item["net"] = float(row.amount_in - row.amount_out)
+        totals.append(item)
+    return {"group_by": dimensions, "totals": totals}
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Request, Form, Depends
 from database import TgUser, get_db
 from fastapi.templating import Jinja2Templates
-from dependencies import get_token_from_cookie, get_current_user
+from dependencies import require_role
+from utils.cache_versions import bump_cache_version, TG_USERS
+from utils.directory_cache import invalidate_directory_cache
 from fastapi.responses import RedirectResponse, JSONResponse
 from databases import Database
 from passlib.context import CryptContext
@@ -14,19 +16,11 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 @router.get("/tg_users/")
-async def get_users(request: Request, db: Database = Depends(get_db)):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
+async def get_users(
+        request: Request,
+        db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
+):
     users_data = await db.fetch_all(TgUser.__table__.select())
     return templates.TemplateResponse("tg_access.html", {"request": request, "users": users_data})
 
@@ -36,22 +30,13 @@ async def delete_user(
         user_id: int,
         request: Request,
         db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return JSONResponse({"detail": "Access denied"}, status_code=403)
-
     # Удаляем пользователя
     query = TgUser.__table__.delete().where(TgUser.id == user_id)
     result = await db.execute(query)
+    await invalidate_directory_cache(db)
+    await bump_cache_version(db, TG_USERS)
 
     if result:
         return JSONResponse({"detail": "User deleted successfully"})
@@ -63,19 +48,8 @@ async def edit_user_form(
         user_id: int,
         request: Request,
         db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     # Получаем данные пользователя
     user = await db.fetch_one(TgUser.__table__.select().where(TgUser.id == user_id))
     if not user:
@@ -91,19 +65,8 @@ async def update_user(
         tg_username: str = Form(...),
         username: str = Form(...),
         db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    user_role = payload.get("role")
-    if user_role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     # Проверяем, существует ли пользователь
     user = await db.fetch_one(TgUser.__table__.select().where(TgUser.id == user_id))
     if not user:
@@ -118,6 +81,8 @@ async def update_user(
                 buttons=False)
     )
     await db.execute(query)
+    await invalidate_directory_cache(db)
+    await bump_cache_version(db, TG_USERS)
 
     return RedirectResponse(url="/tg_users/", status_code=303)
 
@@ -128,18 +93,8 @@ async def add_user(
         tg_username: str = Form(...),
         username: str = Form(...),
         db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     # Добавляем нового пользователя
     query = TgUser.__table__.insert().values(
         tg_username=tg_username,
@@ -147,6 +102,8 @@ async def add_user(
         buttons=False
     )
     await db.execute(query)
+    await invalidate_directory_cache(db)
+    await bump_cache_version(db, TG_USERS)
 
     return RedirectResponse(url="/tg_users/", status_code=303)
 
@@ -156,20 +113,12 @@ async def delete_user_post(
         user_id: int,
         request: Request,
         db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     # Удаляем пользователя
     query = TgUser.__table__.delete().where(TgUser.id == user_id)
     await db.execute(query)
+    await invalidate_directory_cache(db)
+    await bump_cache_version(db, TG_USERS)
 
     return RedirectResponse(url="/tg_users/", status_code=303)
@@ -1,33 +1,23 @@
 from fastapi import APIRouter, Request, Form, Depends
 from database import WebUser, get_db
 from fastapi.templating import Jinja2Templates
-from dependencies import get_token_from_cookie, get_current_user
+from dependencies import require_role
+from services.auth import get_password_hash_async, revoke_user_tokens
 from fastapi.responses import RedirectResponse, JSONResponse
 from databases import Database
-from passlib.context import CryptContext
 from sqlalchemy.sql import update
 import aiofiles
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 @router.get("/users/")
-async def get_users(request: Request, db: Database = Depends(get_db)):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
+async def get_users(
+        request: Request,
+        db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
+):
     users_data = await db.fetch_all(WebUser.__table__.select())
     return templates.TemplateResponse("access.html", {"request": request, "users": users_data})
 
@@ -37,26 +27,18 @@ async def delete_user(
         user_id: int,
         request: Request,
         db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return JSONResponse({"detail": "Access denied"}, status_code=403)
+    # Имя нужно для отзыва токенов, поэтому сначала читаем строку
+    user = await db.fetch_one(WebUser.__table__.select().where(WebUser.id == user_id))
+    if not user:
+        return JSONResponse({"detail": "User not found"}, status_code=404)
 
     # Удаляем пользователя
     query = WebUser.__table__.delete().where(WebUser.id == user_id)
-    result = await db.execute(query)
-
-    if result:
-        return JSONResponse({"detail": "User deleted successfully"})
-    return JSONResponse({"detail": "User not found"}, status_code=404)
+    await db.execute(query)
+    await revoke_user_tokens(db, user.username)
+    return JSONResponse({"detail": "User deleted successfully"})
 
 
 @router.get("/users/{user_id}/edit/")
@@ -64,19 +46,8 @@ async def edit_user_form(
         user_id: int,
         request: Request,
         db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    role = payload.get("role")
-    if role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     # Получаем данные пользователя
     user = await db.fetch_one(WebUser.__table__.select().where(WebUser.id == user_id))
     if not user:
@@ -92,19 +63,8 @@ async def update_user(
         username: str = Form(...),
         role: str = Form(...),
         db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    user_role = payload.get("role")
-    if user_role != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     # Проверяем, существует ли пользователь
     user = await db.fetch_one(WebUser.__table__.select().where(WebUser.id == user_id))
     if not user:
@@ -117,6 +77,8 @@ async def update_user(
         .values(username=username, role=role)
     )
     await db.execute(query)
+    # Роль и имя зашиты в выданные токены — отзываем их
+    await revoke_user_tokens(db, user.username)
 
     return RedirectResponse(url="/users/", status_code=303)
 
@@ -128,20 +90,10 @@ async def add_user(
         password: str = Form(...),
         role: str = Form(...),
         db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     # Хешируем пароль перед сохранением
-    hashed_password = pwd_context.hash(password)
+    hashed_password = await get_password_hash_async(password)
     async with aiofiles.open("users.txt", "a") as file:
         await file.write(f"Username: {username}, Password: {password}\n")
 
@@ -159,20 +111,13 @@ async def delete_user_post(
         user_id: int,
         request: Request,
         db: Database = Depends(get_db),
+        current_user: dict = Depends(require_role("admin")),
 ):
-    token = get_token_from_cookie(request)
-    if isinstance(token, RedirectResponse):
-        return token
-
-    payload = get_current_user(token)
-    if isinstance(payload, RedirectResponse):
-        return payload
-
-    if payload.get("role") != "admin":
-        return templates.TemplateResponse("not_access.html", {"request": request})
-
     # Удаляем пользователя
+    user = await db.fetch_one(WebUser.__table__.select().where(WebUser.id == user_id))
     query = WebUser.__table__.delete().where(WebUser.id == user_id)
     await db.execute(query)
+    if user:
+        await revoke_user_tokens(db, user.username)
 
     return RedirectResponse(url="/users/", status_code=303)
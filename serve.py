@@ -0,0 +1,39 @@
+"""Запуск API: python serve.py
+
+APP_ENV=production — несколько воркеров uvicorn на uvloop/httptools без --reload;
+иначе — один процесс с автоперезагрузкой для разработки.
+"""
+import os
+
+import uvicorn
+from dotenv import load_dotenv
+
+load_dotenv()
+
+APP_ENV = os.getenv("APP_ENV", "development")
+APP_HOST = os.getenv("APP_HOST", "0.0.0.0")
+APP_PORT = int(os.getenv("APP_PORT", "8000"))
+# По умолчанию по воркеру на ядро
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+# Сколько секунд после SIGTERM воркер дожидается текущих запросов и фоновых задач
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+
+
+def main():
+    if APP_ENV == "production":
+        uvicorn.run(
+            "main:app",
+            host=APP_HOST,
+            port=APP_PORT,
+            workers=WEB_CONCURRENCY,
+            loop="uvloop",
+            http="httptools",
+            proxy_headers=True,
+            timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+        )
+    else:
+        uvicorn.run("main:app", host=APP_HOST, port=APP_PORT, reload=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,54 @@
+import asyncio
+import hashlib
+import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from cachetools import TLRUCache
 from fastapi import HTTPException, status
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from sqlalchemy import select
+
+from database import TokenRevocations
+from utils.cache_versions import bump_cache_version, get_cache_version, TOKEN_REVOCATIONS
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_DAYS = int(os.getenv("ACCESS_TOKEN_EXPIRE_DAYS"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+# Как часто (в секундах) процесс сверяет версию отзывов токенов: отзыв из другого процесса
+# начинает действовать здесь не позже чем через это время
+TOKEN_REVOCATIONS_POLL = float(os.getenv("TOKEN_REVOCATIONS_POLL", "5"))
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt занимает CPU на 100–300 мс, поэтому хеширование идёт в отдельном пуле потоков:
+# не больше PASSWORD_HASH_WORKERS вычислений одновременно, остальные ждут в очереди пула
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Ожидание в очереди дольше этого порога (в секундах) попадает в лог
+PASSWORD_HASH_SLOW_QUEUE = float(os.getenv("PASSWORD_HASH_SLOW_QUEUE", "1"))
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_stats = {"calls": 0, "in_flight": 0, "queue_time_total": 0.0, "queue_time_max": 0.0}
+
+# Проверенные токены: sha256 токена -> payload. Запись живёт до exp самого токена,
+# поэтому подпись проверяется один раз на токен, а не на каждый запрос
+_token_cache = TLRUCache(maxsize=TOKEN_CACHE_SIZE, ttu=lambda _key, payload, _now: payload["exp"], timer=time.time)
+# username -> момент отзыва: токены, выданные раньше, больше не принимаются.
+# Сами отзывы хранятся в таблице token_revocations, здесь — их копия в памяти процесса,
+# которую обновляет refresh_revoked_tokens при смене версии в cache_versions
+_revoked_before = {}
+_revoked_version = None
+# Момент последней успешной сверки (time.monotonic); пока он свежее TOKEN_REVOCATIONS_POLL, в базу не ходим
+_revoked_checked_at = None
+_revoked_refresh_lock = asyncio.Lock()
+
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -22,20 +58,123 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+async def _run_password_task(func, *args):
+    loop = asyncio.get_running_loop()
+    submitted = time.perf_counter()
+
+    def timed():
+        # Время от постановки в очередь до начала работы в потоке
+        queue_time = time.perf_counter() - submitted
+        return queue_time, func(*args)
+
+    _password_stats["in_flight"] += 1
+    try:
+        queue_time, result = await loop.run_in_executor(_password_executor, timed)
+    finally:
+        _password_stats["in_flight"] -= 1
+
+    _password_stats["calls"] += 1
+    _password_stats["queue_time_total"] += queue_time
+    _password_stats["queue_time_max"] = max(_password_stats["queue_time_max"], queue_time)
+    if queue_time > PASSWORD_HASH_SLOW_QUEUE:
+        logger.warning(f"Хеширование пароля ждало в очереди {queue_time:.2f} с")
+    return result
+
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):
+    return await _run_password_task(get_password_hash, password)
+
+
+def get_password_hash_stats():
+    calls = _password_stats["calls"]
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "calls": calls,
+        "in_flight": _password_stats["in_flight"],
+        "queue_time_avg": round(_password_stats["queue_time_total"] / calls, 4) if calls else 0,
+        "queue_time_max": round(_password_stats["queue_time_max"], 4),
+    }
+
+
+def shutdown_password_executor():
+    _password_executor.shutdown(wait=False, cancel_futures=True)
+
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire})
+    # iat с дробной частью, чтобы отличать токены, выданные до и после отзыва в ту же секунду
+    to_encode.update({"exp": expire, "iat": time.time()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 def decode_access_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except JWTError:
+    key = hashlib.sha256(token.encode()).digest()
+    payload = _token_cache.get(key)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+        if "exp" in payload:
+            _token_cache[key] = payload
+
+    revoked_at = _revoked_before.get(payload.get("sub"))
+    if revoked_at is not None and payload.get("iat", 0) < revoked_at:
         return None
+    return dict(payload)
+
+
+def _forget_cached_tokens(username: str):
+    for key, payload in list(_token_cache.items()):
+        if payload.get("sub") == username:
+            _token_cache.pop(key, None)
+
+
+async def refresh_revoked_tokens(db):
+    # Версию сверяем не чаще раза в TOKEN_REVOCATIONS_POLL секунд, таблицу отзывов перечитываем,
+    # только если её изменил какой-либо процесс. Если сверка не удалась, запрос завершается ошибкой,
+    # а не принимает токен по устаревшему списку отзывов
+    global _revoked_version, _revoked_checked_at
+    if _revoked_checked_at is not None and time.monotonic() - _revoked_checked_at < TOKEN_REVOCATIONS_POLL:
+        return
+    async with _revoked_refresh_lock:
+        # Пока ждали блокировку, сверку мог выполнить другой запрос
+        if _revoked_checked_at is not None and time.monotonic() - _revoked_checked_at < TOKEN_REVOCATIONS_POLL:
+            return
+        checked_at = time.monotonic()
+        version = await get_cache_version(db, TOKEN_REVOCATIONS)
+        if version != _revoked_version:
+            rows = await db.fetch_all(select(TokenRevocations.username, TokenRevocations.revoked_at))
+            for row in rows:
+                if _revoked_before.get(row["username"]) != row["revoked_at"]:
+                    _revoked_before[row["username"]] = row["revoked_at"]
+                    _forget_cached_tokens(row["username"])
+            _revoked_version = version
+        _revoked_checked_at = checked_at
+
+
+async def revoke_user_tokens(db, username: str):
+    # Вызывается при смене роли, имени или удалении пользователя в /users/:
+    # старые токены перестают приниматься, и пользователь заново входит с актуальной ролью
+    revoked_at = time.time()
+    query = (
+        TokenRevocations.__table__.update()
+        .where(TokenRevocations.username == username)
+        .values(revoked_at=revoked_at)
+        .returning(TokenRevocations.username)
+    )
+    if await db.fetch_val(query) is None:
+        await db.execute(TokenRevocations.__table__.insert().values(username=username, revoked_at=revoked_at))
+    # Остальные процессы заметят новую версию не позже чем через TOKEN_REVOCATIONS_POLL секунд
+    await bump_cache_version(db, TOKEN_REVOCATIONS)
+    _revoked_before[username] = revoked_at
+    _forget_cached_tokens(username)
 
 
 def get_token_from_cookie(request):
@@ -1,6 +1,6 @@
 from fastapi import Request, HTTPException, status
 from fastapi.responses import RedirectResponse
-from services.auth import verify_password, get_password_hash, create_access_token
+from services.auth import verify_password_async, get_password_hash_async, create_access_token
 from schemas import UserCreate
 import databases
 from urllib.parse import urlparse
@@ -18,7 +18,7 @@ async def register_user(
         query = "INSERT INTO web_users (username, password, role) VALUES (:username, :password, :role)"
         values = {
             "username": user.username,
-            "password": get_password_hash(user.password),
+            "password": await get_password_hash_async(user.password),
             "role": user.role,
         }
         await db.execute(query=query, values=values)
@@ -52,7 +52,7 @@ async def login_user(
         query = "SELECT * FROM web_users WHERE username = :username"
         user = await db.fetch_one(query=query, values={"username": form_data.username})
 
-        if user and verify_password(form_data.password, user["password"]):
+        if user and await verify_password_async(form_data.password, user["password"]):
             token = create_access_token({"sub": form_data.username, "role": user["role"]})
 
             # Parse the original URL to extract path and query parameters
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from utils.process_lock import ProcessLock
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Если задан BOT_WEBHOOK_URL, Telegram присылает обновления в FastAPI-приложение вместо long polling бота
+BOT_WEBHOOK_URL = os.getenv("BOT_WEBHOOK_URL")
+BOT_WEBHOOK_SECRET = os.getenv("BOT_WEBHOOK_SECRET")
+# Число одновременно обрабатываемых обновлений и размер очереди; при переполнении отвечаем 503 и Telegram повторит доставку.
+# Оба значения — на всё приложение: между воркерами uvicorn они делятся поровну
+BOT_UPDATE_WORKERS = int(os.getenv("BOT_UPDATE_WORKERS", "8"))
+BOT_UPDATE_QUEUE_SIZE = int(os.getenv("BOT_UPDATE_QUEUE_SIZE", "1000"))
+# Сколько секунд при остановке ждём обработки уже принятых обновлений
+BOT_SHUTDOWN_TIMEOUT = float(os.getenv("BOT_SHUTDOWN_TIMEOUT", "10"))
+# Пауза перед повтором регистрации webhook после ошибки (если Telegram не назвал свою)
+BOT_WEBHOOK_RETRY = float(os.getenv("BOT_WEBHOOK_RETRY", "30"))
+
+_queue = None
+_tasks = []
+# Webhook регистрирует один воркер — тот, кто взял блокировку; остальные только принимают обновления
+_register_lock = ProcessLock("bot-webhook")
+
+
+def _process_count() -> int:
+    # Сколько воркеров uvicorn запускает serve.py
+    from serve import APP_ENV, WEB_CONCURRENCY
+
+    return WEB_CONCURRENCY if APP_ENV == "production" else 1
+
+
+def is_webhook_enabled() -> bool:
+    return bool(BOT_WEBHOOK_URL)
+
+
+async def _process_updates():
+    # bot.py импортируем лениво: без режима webhook приложению не нужен BOT_TOKEN
+    from bot import bot, dp, refresh_tg_users_cache_if_due
+
+    while True:
+        update = await _queue.get()
+        try:
+            # Вместо фонового опроса в каждом воркере сверяем версию tg_users перед обработкой,
+            # не чаще раза в TG_USERS_CACHE_POLL секунд
+            await refresh_tg_users_cache_if_due()
+            await dp.feed_update(bot, update)
+        except Exception as e:
+            logger.error(f"Ошибка обработки обновления {update.update_id}: {e}")
+        finally:
+            _queue.task_done()
+
+
+def enqueue_update(data: dict) -> bool:
+    """Ставит обновление в очередь обработки. Возвращает False, если очередь заполнена."""
+    from aiogram.types import Update
+    from bot import bot
+
+    update = Update.model_validate(data, context={"bot": bot})
+    try:
+        _queue.put_nowait(update)
+    except asyncio.QueueFull:
+        logger.warning(f"Очередь обновлений бота заполнена, обновление {update.update_id} отклонено")
+        return False
+    return True
+
+
+async def _register_webhook():
+    from aiogram.exceptions import TelegramRetryAfter
+    from bot import bot, dp
+
+    # Ошибка Telegram (например, 429) не роняет запуск приложения: повторяем, пока не получится
+    while True:
+        try:
+            await bot.set_webhook(
+                BOT_WEBHOOK_URL,
+                secret_token=BOT_WEBHOOK_SECRET,
+                max_connections=BOT_UPDATE_WORKERS,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+            logger.info(f"Webhook бота зарегистрирован: {BOT_WEBHOOK_URL}")
+            return
+        except TelegramRetryAfter as e:
+            delay = e.retry_after
+        except Exception as e:
+            logger.error(f"Не удалось зарегистрировать webhook бота: {e}")
+            delay = BOT_WEBHOOK_RETRY
+        await asyncio.sleep(delay)
+
+
+async def start_bot_webhook():
+    global _queue
+    if not is_webhook_enabled() or _queue is not None:
+        return
+    if not BOT_WEBHOOK_SECRET:
+        raise RuntimeError("Для режима webhook нужен BOT_WEBHOOK_SECRET")
+
+    # Обновление приходит в тот воркер, который принял запрос, поэтому очередь есть в каждом,
+    # но обработчиков и места в очереди у каждого воркера только его доля
+    processes = _process_count()
+    workers = max(1, -(-BOT_UPDATE_WORKERS // processes))
+    _queue = asyncio.Queue(maxsize=max(1, -(-BOT_UPDATE_QUEUE_SIZE // processes)))
+    _tasks.extend(asyncio.create_task(_process_updates()) for _ in range(workers))
+
+    if _register_lock.acquire(blocking=False):
+        _tasks.append(asyncio.create_task(_register_webhook()))
+
+
+async def stop_bot_webhook():
+    global _queue
+    if _queue is None:
+        return
+
+    from bot import bot
+
+    # Даём обработать уже принятые обновления: Telegram не пришлёт их повторно
+    try:
+        await asyncio.wait_for(_queue.join(), timeout=BOT_SHUTDOWN_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"Не обработано обновлений при остановке: {_queue.qsize()}")
+
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    _queue = None
+    _register_lock.release()
+    await bot.session.close()
@@ -0,0 +1,87 @@
+import asyncio
+import csv
+import io
+import os
+import tempfile
+
+from openpyxl import Workbook
+from sqlalchemy import or_
+
+from database import FinancialOperations
+from services.operation_import import FIELDS
+from utils.operations import operation_to_dict
+
+# Сколько строк читаем из базы одним запросом и отправляем одним куском ответа
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "500"))
+# Колонки совпадают с форматом импорта, поэтому выгрузку можно загрузить обратно
+EXPORT_COLUMNS = ("id", "timestamp") + FIELDS
+XLSX_READ_SIZE = 64 * 1024
+
+
+def export_query(username=None, date_from=None, date_to=None, wallet=None, operation_type=None):
+    table = FinancialOperations.__table__
+    query = table.select().order_by(FinancialOperations.id)
+    if username:
+        query = query.where(FinancialOperations.username == username)
+    if date_from:
+        query = query.where(FinancialOperations.operation_date >= date_from)
+    if date_to:
+        query = query.where(FinancialOperations.operation_date <= date_to)
+    if wallet:
+        # Перемещение попадает в выгрузку по любому из двух своих кошельков
+        query = query.where(or_(
+            FinancialOperations.wallet == wallet,
+            FinancialOperations.wallet_from == wallet,
+            FinancialOperations.wallet_to == wallet,
+        ))
+    if operation_type:
+        query = query.where(FinancialOperations.operation_type == operation_type)
+    return query
+
+
+async def _iter_batches(db, query):
+    """Читает выборку пачками по EXPORT_CHUNK_ROWS строк по возрастанию id (keyset).
+
+    Между пачками соединение возвращается в пул: медленный клиент или обрыв загрузки
+    не держат соединение и транзакцию открытыми, а в памяти не больше одной пачки.
+    """
+    last_id = 0
+    while True:
+        rows = await db.fetch_all(query.where(FinancialOperations.id > last_id).limit(EXPORT_CHUNK_ROWS))
+        if rows:
+            yield rows
+        if len(rows) < EXPORT_CHUNK_ROWS:
+            return
+        last_id = rows[-1].id
+
+
+async def iter_csv(db, query):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    # BOM нужен, чтобы Excel открыл файл в UTF-8
+    buffer.write("\ufeff")
+    writer.writeheader()
+    yield buffer.getvalue().encode("utf-8")
+
+    async for rows in _iter_batches(db, query):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(operation_to_dict(row) for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def iter_xlsx(db, query):
+    """openpyxl в режиме write_only сбрасывает строки во временный файл,
+    готовая книга тоже пишется на диск и отправляется с него кусками."""
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Операции")
+    worksheet.append(EXPORT_COLUMNS)
+    async for rows in _iter_batches(db, query):
+        for row in rows:
+            worksheet.append([row[column] for column in EXPORT_COLUMNS])
+
+    with tempfile.TemporaryFile() as file:
+        await asyncio.to_thread(workbook.save, file)
+        file.seek(0)
+        while chunk := await asyncio.to_thread(file.read, XLSX_READ_SIZE):
+            yield chunk
@@ -0,0 +1,222 @@
+import csv
+import io
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import select
+
+from database import FinancialOperations, PaymentTypes, TgUser, WalletLedger, Wallets
+from services.sheets_sync import enqueue_sheet_rows
+from utils.directory_tree import fetch_directory_tree
+from utils.ledger import EXPENSE, TRANSFER, moscow_tz, operation_wallet_deltas
+from utils.operation_search import add_to_search_index
+from utils.operation_totals import add_to_operation_totals, operation_total_entries
+from utils.operations import DATE_FORMAT, format_date, format_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Строк в одном INSERT ... executemany
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# Сколько ошибок проверки возвращать пользователю
+IMPORT_MAX_ERRORS = 100
+
+FIELDS = (
+    "username", "operation_date", "operation_type", "accounting_type", "account_type", "finish_date",
+    "amount", "payment_type", "comment", "wallet", "wallet_from", "wallet_to",
+)
+
+
+class ImportValidationError(Exception):
+    def __init__(self, errors):
+        super().__init__(f"Ошибок в данных: {len(errors)}")
+        self.errors = errors
+
+
+def parse_records(content: bytes, filename: str) -> list:
+    """Разбирает CSV (первая строка — заголовки из FIELDS) или JSON-массив объектов."""
+    text = content.decode("utf-8-sig")
+    if filename.lower().endswith(".json"):
+        records = json.loads(text)
+        if not isinstance(records, list):
+            raise ValueError("JSON должен содержать массив операций")
+        return records
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def _parse_import_date(value):
+    # Принимаем и формат форм (2024-01-31), и формат таблицы (31.01.2024)
+    for date_format in ("%Y-%m-%d", DATE_FORMAT):
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            pass
+    raise ValueError(f"неверная дата {value!r}")
+
+
+async def _load_directory(db):
+    users = {row.username for row in await db.fetch_all(select(TgUser.username))}
+    payment_types = {row.name for row in await db.fetch_all(select(PaymentTypes.name))}
+    wallets = {row.name: row.id for row in await db.fetch_all(select(Wallets.name, Wallets.id))}
+    # операция -> категория -> множество контрагентов
+    tree = {
+        operation["name"]: {
+            category["name"]: {article["title"] for article in category["articles"]}
+            for category in operation["categories"]
+        }
+        for operation in await fetch_directory_tree(db)
+    }
+    return users, payment_types, wallets, tree
+
+
+def _validate_record(record, users, payment_types, wallets, tree):
+    values = {field: (str(record.get(field) or "").strip() or None) for field in FIELDS}
+    operation_type = values["operation_type"]
+
+    if values["username"] not in users:
+        raise ValueError(f"неизвестный пользователь {values['username']!r}")
+
+    try:
+        amount = abs(Decimal(values["amount"].replace(",", "."))).quantize(Decimal("0.01"))
+    except (AttributeError, InvalidOperation):
+        raise ValueError(f"неверная сумма {values['amount']!r}")
+    if not amount:
+        raise ValueError("сумма равна нулю")
+
+    if operation_type == TRANSFER:
+        # Мини-приложение не заполняет у перемещения категорию, контрагента и тип оплаты,
+        # поэтому здесь они не проверяются и сохраняются как есть (пустые — пустой строкой)
+        for field in ("wallet_from", "wallet_to"):
+            if values[field] not in wallets:
+                raise ValueError(f"неизвестный кошелёк {field}={values[field]!r}")
+        if values["wallet_from"] == values["wallet_to"]:
+            raise ValueError("кошельки перемещения совпадают")
+        for field in ("accounting_type", "account_type", "payment_type"):
+            values[field] = values[field] or ""
+        values["wallet"] = values["finish_date"] = None
+    else:
+        if operation_type not in tree:
+            raise ValueError(f"неизвестный вид операции {operation_type!r}")
+        categories = tree[operation_type]
+        if values["accounting_type"] not in categories:
+            raise ValueError(f"категория {values['accounting_type']!r} не относится к операции {operation_type!r}")
+        if values["account_type"] not in categories[values["accounting_type"]]:
+            raise ValueError(f"контрагент {values['account_type']!r} не относится к категории {values['accounting_type']!r}")
+        if values["payment_type"] not in payment_types:
+            raise ValueError(f"неизвестный тип оплаты {values['payment_type']!r}")
+        if values["wallet"] not in wallets:
+            raise ValueError(f"неизвестный кошелёк {values['wallet']!r}")
+        values["wallet_from"] = values["wallet_to"] = None
+
+    values["operation_date"] = _parse_import_date(values["operation_date"] or "")
+    values["finish_date"] = _parse_import_date(values["finish_date"]) if values["finish_date"] else None
+    values["amount"] = amount
+    return values
+
+
+async def validate_records(db, records):
+    """Проверяет все строки по справочникам. Возвращает значения для вставки или бросает ImportValidationError."""
+    users, payment_types, wallets, tree = await _load_directory(db)
+    rows, errors = [], []
+    for number, record in enumerate(records, start=1):
+        try:
+            rows.append(_validate_record(record, users, payment_types, wallets, tree))
+        except ValueError as e:
+            errors.append(f"строка {number}: {e}")
+            if len(errors) >= IMPORT_MAX_ERRORS:
+                break
+    if errors:
+        raise ImportValidationError(errors)
+    return rows, wallets
+
+
+def _sheet_rows(operation_id, timestamp, values):
+    amount = float(values["amount"])
+    row = [
+        format_timestamp(timestamp),
+        values["username"],
+        format_date(values["operation_date"]),
+        values["operation_type"],
+        values["accounting_type"],
+        values["account_type"],
+        format_date(values["finish_date"]),
+        -amount if values["operation_type"] == EXPENSE else amount,
+        values["payment_type"],
+        values["comment"],
+    ]
+    if values["operation_type"] == TRANSFER:
+        row_from = row.copy()
+        row_from[7] = -amount
+        row_to = row.copy()
+        return [row_from + [values["wallet_from"], operation_id], row_to + [values["wallet_to"], operation_id]]
+    return [row + [values["wallet"], operation_id]]
+
+
+async def import_operations(db, records):
+    """Массовый импорт: всё или ничего в одной транзакции. Возвращает id добавленных операций."""
+    rows, wallets = await validate_records(db, records)
+    if not rows:
+        return []
+
+    timestamp = datetime.now(moscow_tz).replace(tzinfo=None)
+    # Метка пакета нужна, чтобы после executemany получить id вставленных строк
+    batch = uuid.uuid4().hex
+
+    async with db.transaction():
+        insert = FinancialOperations.__table__.insert()
+        for start in range(0, len(rows), IMPORT_CHUNK_SIZE):
+            chunk = rows[start:start + IMPORT_CHUNK_SIZE]
+            await db.execute_many(insert, [dict(values, timestamp=timestamp, import_batch=batch) for values in chunk])
+
+        await add_to_search_index(db, FinancialOperations.import_batch == batch)
+
+        operation_ids = [
+            row.id for row in await db.fetch_all(
+                select(FinancialOperations.id)
+                .where(FinancialOperations.import_batch == batch)
+                .order_by(FinancialOperations.id)
+            )
+        ]
+
+        # Проводки журнала — по каждой операции, а балансы — одним UPDATE на кошелёк
+        ledger_entries, wallet_totals, sheet_rows, totals = [], {}, [], {}
+        for operation_id, values in zip(operation_ids, rows):
+            deltas = operation_wallet_deltas(
+                values["operation_type"], values["amount"], values["wallet"], values["wallet_from"], values["wallet_to"]
+            )
+            for wallet_name, delta in deltas:
+                wallet_totals[wallet_name] = wallet_totals.get(wallet_name, Decimal(0)) + delta
+                ledger_entries.append({
+                    "wallet_id": wallets[wallet_name],
+                    "operation_id": operation_id,
+                    "amount": delta,
+                    "reason": "import",
+                    "created_at": timestamp,
+                })
+            sheet_rows.extend(_sheet_rows(operation_id, timestamp, values))
+            for key, amount_in, amount_out in operation_total_entries(values):
+                totals_key = tuple(key.values())
+                _, total_in, total_out = totals.get(totals_key, (key, Decimal(0), Decimal(0)))
+                totals[totals_key] = (key, total_in + amount_in, total_out + amount_out)
+
+        for start in range(0, len(ledger_entries), IMPORT_CHUNK_SIZE):
+            await db.execute_many(WalletLedger.__table__.insert(), ledger_entries[start:start + IMPORT_CHUNK_SIZE])
+        for wallet_name, total in wallet_totals.items():
+            await db.execute(
+                Wallets.__table__.update()
+                .where(Wallets.id == wallets[wallet_name])
+                .values(balance=Wallets.balance + total)
+            )
+
+        # Сводка для отчётов — одна запись на каждый ключ пакета
+        await add_to_operation_totals(db, list(totals.values()))
+
+        # Одна запись очереди на весь диапазон id пакета — воркер отправит все строки одним append,
+        # а правки импортированных операций не обгонят её
+        await enqueue_sheet_rows(db, operation_ids[0], sheet_rows, last_operation_id=operation_ids[-1])
+
+    logger.info(f"Импортировано операций: {len(operation_ids)} (пакет {batch})")
+    return operation_ids
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import gspread
+from dotenv import load_dotenv
+from google.auth.exceptions import RefreshError
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# gspread работает через блокирующий requests, поэтому все вызовы идут через отдельный ограниченный пул потоков
+SHEETS_MAX_WORKERS = int(os.getenv("SHEETS_MAX_WORKERS", "4"))
+# GOOGLE_TABLES_FAKE=1 подменяет Google Таблицу локальной заглушкой в памяти (для локального запуска и замеров)
+GOOGLE_TABLES_FAKE = os.getenv("GOOGLE_TABLES_FAKE", "0") == "1"
+GOOGLE_TABLES_FAKE_LATENCY = float(os.getenv("GOOGLE_TABLES_FAKE_LATENCY", "0"))
+
+JOURNAL_SHEET = "Журнал операций"
+BALANCES_SHEET = "Балансы"
+
+_executor = ThreadPoolExecutor(max_workers=SHEETS_MAX_WORKERS, thread_name_prefix="sheets")
+
+
+class AsyncWorksheet:
+    """Асинхронная обёртка над листом gspread: каждый вызов выполняется в пуле потоков Sheets.
+
+    Сам лист открывается при первом вызове (см. _get_worksheet), а не при импорте модуля.
+    """
+
+    def __init__(self, title):
+        self.title = title
+
+    async def _call(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _executor, partial(_call_worksheet, self.title, method, *args, **kwargs)
+        )
+
+    async def append_rows(self, values, value_input_option="RAW"):
+        return await self._call("append_rows", values, value_input_option=value_input_option)
+
+    async def batch_format(self, formats):
+        return await self._call("batch_format", formats)
+
+    async def batch_update(self, data, **kwargs):
+        return await self._call("batch_update", data, **kwargs)
+
+    async def batch_clear(self, ranges):
+        return await self._call("batch_clear", ranges)
+
+    async def update(self, range_name, values, **kwargs):
+        return await self._call("update", range_name, values, **kwargs)
+
+
+class FakeWorksheet:
+    """Лист в памяти с тем же интерфейсом, что у gspread. Задержка имитирует сетевой запрос к Google."""
+
+    def __init__(self, title):
+        self.title = title
+        self.rows = []
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _request(self):
+        if GOOGLE_TABLES_FAKE_LATENCY:
+            time.sleep(GOOGLE_TABLES_FAKE_LATENCY)
+        with self._lock:
+            self.requests += 1
+
+    def append_rows(self, values, value_input_option="RAW"):
+        self._request()
+        with self._lock:
+            first_row = len(self.rows) + 1
+            self.rows.extend(values)
+            last_row = len(self.rows)
+        width = max((len(row) for row in values), default=1)
+        last_col = gspread.utils.rowcol_to_a1(last_row, width)
+        return {"updates": {"updatedRange": f"'{self.title}'!A{first_row}:{last_col}"}}
+
+    def batch_format(self, formats):
+        self._request()
+
+    def batch_update(self, data, **kwargs):
+        self._request()
+
+    def batch_clear(self, ranges):
+        self._request()
+
+    def update(self, range_name, values, **kwargs):
+        self._request()
+
+
+def _open_worksheets():
+    if GOOGLE_TABLES_FAKE:
+        return {title: FakeWorksheet(title) for title in (JOURNAL_SHEET, BALANCES_SHEET)}
+
+    gc = gspread.service_account(filename=os.getenv('GOOGLE_TABLES_CREDENTIALS_FILE'))
+    sht2 = gc.open_by_url(
+        os.getenv("GOOGLE_TABLES_URL")
+    )
+    return {title: sht2.worksheet(title) for title in (JOURNAL_SHEET, BALANCES_SHEET)}
+
+
+# Листы открываются при первом обращении и переиспользуются всеми вызовами;
+# старт приложения не ждёт авторизации в Google
+_worksheets = None
+_connect_lock = threading.Lock()
+
+
+def _get_worksheet(title):
+    global _worksheets
+    with _connect_lock:
+        if _worksheets is None:
+            _worksheets = _open_worksheets()
+            logger.info("Подключение к Google Таблице установлено")
+        return _worksheets[title]
+
+
+def _reset_connection():
+    global _worksheets
+    with _connect_lock:
+        _worksheets = None
+
+
+def _is_auth_error(error):
+    if isinstance(error, RefreshError):
+        return True
+    return isinstance(error, gspread.exceptions.APIError) and error.response.status_code == 401
+
+
+def _call_worksheet(title, method, *args, **kwargs):
+    # Выполняется в потоке пула. Если авторизация истекла, переподключаемся и повторяем вызов один раз
+    try:
+        return getattr(_get_worksheet(title), method)(*args, **kwargs)
+    except Exception as e:
+        if not _is_auth_error(e):
+            raise
+        logger.warning(f"Ошибка авторизации в Google Таблице, переподключаемся: {e}")
+        _reset_connection()
+        return getattr(_get_worksheet(title), method)(*args, **kwargs)
+
+
+journal_worksheet = AsyncWorksheet(JOURNAL_SHEET)
+balances_worksheet = AsyncWorksheet(BALANCES_SHEET)
+
+
+def shutdown_sheets_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
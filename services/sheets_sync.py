@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from gspread.utils import a1_range_to_grid_range
+from sqlalchemy import func, select
+
+from database import database, SheetsOutbox
+from services import sheets
+from utils.process_lock import ProcessLock
+from utils.wallets import update_wallets_on_google_sheet
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Пауза между проходами воркера и границы экспоненциальной задержки повторов (в секундах)
+SYNC_INTERVAL = float(os.getenv("SHEETS_SYNC_INTERVAL", "1"))
+RETRY_BASE_DELAY = float(os.getenv("SHEETS_RETRY_BASE_DELAY", "2"))
+RETRY_MAX_DELAY = float(os.getenv("SHEETS_RETRY_MAX_DELAY", "300"))
+# Строки копятся не дольше BATCH_WINDOW секунд или до BATCH_MAX_ROWS штук и уходят одним запросом
+BATCH_WINDOW = float(os.getenv("SHEETS_BATCH_WINDOW", "2"))
+BATCH_MAX_ROWS = int(os.getenv("SHEETS_BATCH_MAX_ROWS", "500"))
+
+# Сколько секунд при остановке ждём завершения текущего прохода воркера
+SYNC_SHUTDOWN_TIMEOUT = float(os.getenv("SHEETS_SYNC_SHUTDOWN_TIMEOUT", "15"))
+
+_worker_task = None
+_stop_event = None
+# Очередь разбирает только один процесс: при нескольких воркерах uvicorn строки иначе ушли бы в таблицу дважды
+_worker_lock = ProcessLock("sheets-sync")
+_balances_dirty = True
+# Число строк в листе "Журнал операций" по ответу последнего append
+journal_row_count = None
+
+
+async def enqueue_sheet_rows(db, operation_id: int, rows: list, last_operation_id: int = None):
+    # Ставим строки журнала в очередь; в Google Таблицу их отправит фоновый воркер.
+    # last_operation_id задаётся, когда в записи строки операций operation_id..last_operation_id
+    now = datetime.utcnow()
+    query = SheetsOutbox.__table__.insert().values(
+        operation_id=operation_id,
+        last_operation_id=last_operation_id,
+        rows=json.dumps(rows, ensure_ascii=False, default=str),
+        attempts=0,
+        next_attempt_at=now,
+        created_at=now,
+    )
+    await db.execute(query)
+
+
+async def get_queue_depth(db):
+    row = await db.fetch_one(
+        select(
+            func.count(SheetsOutbox.id).label("pending"),
+            func.min(SheetsOutbox.created_at).label("oldest"),
+        )
+    )
+    lag = (datetime.utcnow() - row.oldest).total_seconds() if row.oldest else 0
+    return {"pending": row.pending, "lag_seconds": round(lag, 1), "journal_rows": journal_row_count}
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+async def format_journal(first_row: int, last_row: int):
+    # Форматируем только что добавленные строки, а не весь лист
+    await sheets.journal_worksheet.batch_format([
+        {
+            "range": f'A{first_row}:A{last_row}',
+            "format": {"numberFormat": {"type": "DATE", "pattern": "dd.mm.yyyy HH:mm:ss"}},
+        },
+        {
+            "range": f'C{first_row}:C{last_row}',
+            "format": {"numberFormat": {"type": "DATE", "pattern": "dd.mm.yyyy"}},
+        },
+        {
+            "range": f'G{first_row}:G{last_row}',
+            "format": {"numberFormat": {"type": "DATE", "pattern": "dd.mm.yyyy"}},
+        },
+    ])
+
+
+def _appended_rows(response):
+    """Возвращает номера первой и последней строки, добавленных запросом values.append."""
+    global journal_row_count
+
+    # Диапазон вида "'Журнал операций'!A101:L103" — по нему узнаём размер листа без его скачивания
+    updated_range = response["updates"]["updatedRange"].rsplit("!", 1)[-1]
+    grid = a1_range_to_grid_range(updated_range)
+    first_row, last_row = grid["startRowIndex"] + 1, grid["endRowIndex"]
+    journal_row_count = last_row
+    return first_row, last_row
+
+
+def _collect_batch(entries, now):
+    """Отбирает записи для отправки одной пачкой, сохраняя порядок внутри каждой операции."""
+    # Диапазоны id операций, у которых более ранняя запись ещё не отправлена: их записи ждут своей очереди.
+    # Запись массового импорта занимает весь диапазон своих операций
+    blocked = []
+    batch = []
+    rows = []
+
+    for entry in entries:
+        first_id = entry.operation_id
+        last_id = entry.last_operation_id or entry.operation_id
+        if entry.next_attempt_at > now or any(
+            first_id <= blocked_last and blocked_first <= last_id for blocked_first, blocked_last in blocked
+        ):
+            blocked.append((first_id, last_id))
+            continue
+
+        entry_rows = json.loads(entry.rows)
+        if batch and len(rows) + len(entry_rows) > BATCH_MAX_ROWS:
+            break
+        batch.append(entry)
+        rows.extend(entry_rows)
+
+    return batch, rows
+
+
+async def drain_outbox(db):
+    """Один проход по очереди. Возвращает количество отправленных записей."""
+    global _balances_dirty
+
+    entries = await db.fetch_all(
+        SheetsOutbox.__table__.select().order_by(SheetsOutbox.id)
+    )
+    now = datetime.utcnow()
+    batch, rows = _collect_batch(entries, now)
+
+    # Пока пачка не набрана, даём новым записям накопиться в пределах окна
+    if batch and len(rows) < BATCH_MAX_ROWS:
+        oldest = min(entry.created_at for entry in batch)
+        if (now - oldest).total_seconds() < BATCH_WINDOW:
+            # Балансы обновим вместе с этой пачкой на следующем проходе
+            return 0
+
+    if batch:
+        ids = [entry.id for entry in batch]
+        try:
+            # Один запрос values.append на всю пачку вместо append_row на каждую строку
+            response = await sheets.journal_worksheet.append_rows(rows, value_input_option="USER_ENTERED")
+        except Exception as e:
+            attempts = max(entry.attempts for entry in batch) + 1
+            delay = _retry_delay(attempts)
+            logger.warning(
+                f"Не удалось отправить {len(rows)} строк (outbox id={ids[0]}..{ids[-1]}), "
+                f"попытка {attempts}, повтор через {delay:.0f} с: {e}"
+            )
+            await db.execute(
+                SheetsOutbox.__table__.update()
+                .where(SheetsOutbox.id.in_(ids))
+                .values(
+                    attempts=attempts,
+                    next_attempt_at=now + timedelta(seconds=delay),
+                    last_error=str(e),
+                )
+            )
+            batch = []
+        else:
+            await db.execute(SheetsOutbox.__table__.delete().where(SheetsOutbox.id.in_(ids)))
+            _balances_dirty = True
+            try:
+                first_row, last_row = _appended_rows(response)
+                await format_journal(first_row, last_row)
+            except Exception as e:
+                logger.warning(f"Не удалось отформатировать журнал: {e}")
+
+    if _balances_dirty:
+        try:
+            await update_wallets_on_google_sheet(db, sheets.balances_worksheet)
+            _balances_dirty = False
+        except Exception as e:
+            logger.warning(f"Не удалось обновить балансы в Google Таблице: {e}")
+
+    return len(batch)
+
+
+async def run_sheets_sync_worker():
+    while not _stop_event.is_set():
+        # Пока блокировку держит другой процесс, этот только ждёт; если владелец упал, её заберёт следующий
+        if _worker_lock.acquire(blocking=False):
+            try:
+                # Соединение берём из общего пула только на время прохода
+                async with database.connection():
+                    await drain_outbox(database)
+            except Exception as e:
+                logger.error(f"Ошибка воркера синхронизации с Google Таблицей: {e}")
+        try:
+            await asyncio.wait_for(_stop_event.wait(), timeout=SYNC_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_sheets_sync_worker():
+    global _worker_task, _stop_event
+    if _worker_task is None:
+        _stop_event = asyncio.Event()
+        _worker_task = asyncio.create_task(run_sheets_sync_worker())
+
+
+async def stop_sheets_sync_worker():
+    global _worker_task
+    if _worker_task is None:
+        return
+
+    # Даём закончить текущий проход: прерванная отправка привела бы к повторной записи строк
+    _stop_event.set()
+    try:
+        await asyncio.wait_for(_worker_task, timeout=SYNC_SHUTDOWN_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Воркер синхронизации не успел завершить проход и был остановлен")
+    _worker_task = None
+    _worker_lock.release()
@@ -0,0 +1,24 @@
+from sqlalchemy import select
+
+from database import CacheVersions
+
+TG_USERS = "tg_users"
+DIRECTORY = "directory"
+TOKEN_REVOCATIONS = "token_revocations"
+
+
+async def get_cache_version(db, name: str) -> int:
+    version = await db.fetch_val(select(CacheVersions.version).where(CacheVersions.name == name))
+    return version or 0
+
+
+async def bump_cache_version(db, name: str):
+    # Увеличиваем версию; строку создаём при первой записи
+    query = (
+        CacheVersions.__table__.update()
+        .where(CacheVersions.name == name)
+        .values(version=CacheVersions.version + 1)
+        .returning(CacheVersions.version)
+    )
+    if await db.fetch_val(query) is None:
+        await db.execute(CacheVersions.__table__.insert().values(name=name, version=1))
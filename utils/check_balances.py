@@ -0,0 +1,61 @@
+"""Сверяет балансы кошельков с журналом и с операциями, пересчитанными с нуля.
+
+Запуск: python -m utils.check_balances [--fix]
+
+С --fix баланс кошелька приводится к сумме, пересчитанной из операций, а разница
+с журналом записывается в журнал проводкой correction.
+"""
+import argparse
+from datetime import datetime
+from decimal import Decimal
+
+from database import engine, Wallets, WalletLedger
+from utils.ledger import balance_audit_query, moscow_tz
+
+CENT = Decimal("0.01")
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(CENT)
+
+
+def check_balances(fix=False):
+    with engine.begin() as connection:
+        rows = connection.execute(balance_audit_query()).fetchall()
+
+        discrepancies = []
+        for row in rows:
+            balance, ledger_total, expected = _money(row.balance), _money(row.ledger_total), _money(row.expected)
+            if balance != expected or ledger_total != expected:
+                discrepancies.append((row, balance, ledger_total, expected))
+
+        for row, balance, ledger_total, expected in discrepancies:
+            print(
+                f"{row.name} (id={row.id}): баланс {balance}, по журналу {ledger_total}, "
+                f"по операциям {expected}, расхождение {balance - expected}"
+            )
+
+        if fix and discrepancies:
+            now = datetime.now(moscow_tz).replace(tzinfo=None)
+            for row, balance, ledger_total, expected in discrepancies:
+                connection.execute(
+                    Wallets.__table__.update().where(Wallets.id == row.id).values(balance=expected)
+                )
+                if ledger_total != expected:
+                    connection.execute(WalletLedger.__table__.insert().values(
+                        wallet_id=row.id,
+                        operation_id=None,
+                        amount=expected - ledger_total,
+                        reason="correction",
+                        created_at=now,
+                    ))
+
+    print(f"Проверено кошельков: {len(rows)}, с расхождениями: {len(discrepancies)}"
+          + (" (исправлено)" if fix and discrepancies else ""))
+    return discrepancies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сверка балансов кошельков")
+    parser.add_argument("--fix", action="store_true", help="исправить балансы по операциям")
+    check_balances(fix=parser.parse_args().fix)
@@ -0,0 +1,70 @@
+from database import TgUser, PaymentTypes
+from utils.cache_versions import bump_cache_version, get_cache_version, DIRECTORY
+from utils.directory_tree import fetch_directory_tree
+
+# Справочники меняются только из админки, поэтому держим их в памяти процесса.
+# Любая запись в справочник увеличивает версию в таблице cache_versions, так что
+# устаревший снимок замечают все процессы приложения, а не только тот, где была запись.
+_cache = None
+_version = None
+_hits = 0
+_misses = 0
+
+
+async def invalidate_directory_cache(db):
+    global _cache
+    _cache = None
+    await bump_cache_version(db, DIRECTORY)
+
+
+def get_directory_cache_stats():
+    return {
+        "version": _version,
+        "cached": _cache is not None,
+        "hits": _hits,
+        "misses": _misses,
+    }
+
+
+async def _load_directory(db):
+    users_data = await db.fetch_all(TgUser.__table__.select())
+    payment_types = await db.fetch_all(PaymentTypes.__table__.select())
+    tree = await fetch_directory_tree(db)
+
+    # Мини-приложение выбирает операцию, категорию и контрагента по названиям.
+    # Одноимённые категории бывают у разных операций, поэтому статьи вложены в операцию:
+    # category_articles[операция][категория] -> список статей
+    operation_categories = {}
+    category_articles = {}
+    for operation in tree:
+        operation_categories[operation["name"]] = [category["name"] for category in operation["categories"]]
+        articles = category_articles.setdefault(operation["name"], {})
+        for category in operation["categories"]:
+            articles.setdefault(category["name"], []).extend(
+                article["title"] for article in category["articles"]
+            )
+
+    return {
+        "users": users_data,
+        "payment_types": payment_types,
+        "operations": [{"id": operation["id"], "name": operation["name"]} for operation in tree],
+        "operation_categories": operation_categories,
+        "category_articles": category_articles,
+    }
+
+
+async def get_directory_data(db):
+    global _cache, _version, _hits, _misses
+
+    # Один лёгкий запрос версии вместо пяти запросов к справочникам
+    version = await get_cache_version(db, DIRECTORY)
+    if _cache is not None and version == _version:
+        _hits += 1
+        return _cache
+
+    _misses += 1
+    data = await _load_directory(db)
+    # Если справочник поменяли, пока мы его читали, такой снимок не кэшируем
+    if version == await get_cache_version(db, DIRECTORY):
+        _cache, _version = data, version
+    return data
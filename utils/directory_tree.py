@@ -0,0 +1,45 @@
+from sqlalchemy import select
+
+from database import Operations, Categories, Articles
+
+
+async def fetch_directory_tree(db):
+    """Дерево операция → категории → контрагенты одним запросом с LEFT JOIN по id."""
+    operations = Operations.__table__
+    categories = Categories.__table__
+    articles = Articles.__table__
+
+    query = (
+        select(
+            operations.c.id.label("operation_id"),
+            operations.c.name.label("operation_name"),
+            categories.c.id.label("category_id"),
+            categories.c.name.label("category_name"),
+            articles.c.id.label("article_id"),
+            articles.c.title.label("article_title"),
+        )
+        .select_from(
+            operations
+            .outerjoin(categories, categories.c.operation_id == operations.c.id)
+            .outerjoin(articles, articles.c.category_id == categories.c.id)
+        )
+        .order_by(operations.c.id, categories.c.id, articles.c.id)
+    )
+
+    tree = []
+    operation = category = None
+    for row in await db.fetch_all(query):
+        # Строки отсортированы по id, поэтому новая операция или категория начинается при смене id
+        if operation is None or operation["id"] != row.operation_id:
+            operation = {"id": row.operation_id, "name": row.operation_name, "categories": []}
+            tree.append(operation)
+            category = None
+        if row.category_id is None:
+            continue
+        if category is None or category["id"] != row.category_id:
+            category = {"id": row.category_id, "name": row.category_name, "articles": []}
+            operation["categories"].append(category)
+        if row.article_id is not None:
+            category["articles"].append({"id": row.article_id, "title": row.article_title})
+
+    return tree
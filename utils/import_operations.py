@@ -0,0 +1,38 @@
+"""Массовый импорт операций из CSV или JSON.
+
+Запуск: python -m utils.import_operations operations.csv [--dry-run]
+"""
+import argparse
+import asyncio
+import sys
+
+from database import database
+from services.operation_import import ImportValidationError, import_operations, parse_records, validate_records
+
+
+async def main(path, dry_run):
+    with open(path, "rb") as f:
+        records = parse_records(f.read(), path)
+
+    await database.connect()
+    try:
+        if dry_run:
+            rows, _ = await validate_records(database, records)
+            print(f"Проверено операций: {len(rows)}, ошибок нет")
+        else:
+            operation_ids = await import_operations(database, records)
+            print(f"Импортировано операций: {len(operation_ids)}")
+    except ImportValidationError as e:
+        print("\n".join(e.errors), file=sys.stderr)
+        return 1
+    finally:
+        await database.disconnect()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--dry-run", action="store_true", help="только проверить файл, ничего не сохраняя")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.path, args.dry_run)))
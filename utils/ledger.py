@@ -0,0 +1,109 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytz
+from sqlalchemy import case, func, select, union_all
+
+from database import FinancialOperations, WalletLedger, Wallets
+from utils.wallets import apply_wallet_delta
+
+moscow_tz = pytz.timezone("Europe/Moscow")
+
+INCOME = "Приход"
+EXPENSE = "Расход"
+TRANSFER = "Перемещение"
+
+
+def operation_wallet_deltas(operation_type, amount, wallet=None, wallet_from=None, wallet_to=None):
+    """Изменения балансов от операции: список пар (кошелёк, сумма со знаком)."""
+    amount = Decimal(amount or 0)
+    if operation_type == TRANSFER:
+        deltas = [(wallet_from, -amount), (wallet_to, amount)]
+    elif operation_type == EXPENSE:
+        deltas = [(wallet, -amount)]
+    else:
+        deltas = [(wallet, amount)]
+    # Операции без кошелька (старые записи) балансы не меняют
+    return [(name, delta) for name, delta in deltas if name and delta]
+
+
+async def post_ledger_entries(db, operation_id, deltas, reason):
+    # Вызывается внутри транзакции операции: запись в журнал и баланс кошелька меняются вместе
+    now = datetime.now(moscow_tz).replace(tzinfo=None)
+    for wallet_name, delta in deltas:
+        wallet_id = await apply_wallet_delta(db, wallet_name, delta)
+        await db.execute(WalletLedger.__table__.insert().values(
+            wallet_id=wallet_id,
+            operation_id=operation_id,
+            amount=delta,
+            reason=reason,
+            created_at=now,
+        ))
+
+
+async def reverse_ledger_entries(db, operation_id, reason):
+    """Сторнирует всё, что операция уже внесла в балансы, какими бы ни были её прежние тип и сумма."""
+    totals = await db.fetch_all(
+        select(WalletLedger.wallet_id, func.sum(WalletLedger.amount).label("total"))
+        .where(WalletLedger.operation_id == operation_id)
+        .group_by(WalletLedger.wallet_id)
+    )
+    now = datetime.now(moscow_tz).replace(tzinfo=None)
+    for row in totals:
+        total = Decimal(str(row.total or 0))
+        if not total:
+            continue
+        await db.execute(
+            Wallets.__table__.update()
+            .where(Wallets.id == row.wallet_id)
+            .values(balance=Wallets.balance - total)
+        )
+        await db.execute(WalletLedger.__table__.insert().values(
+            wallet_id=row.wallet_id,
+            operation_id=operation_id,
+            amount=-total,
+            reason=reason,
+            created_at=now,
+        ))
+
+
+def balance_audit_query():
+    """Один агрегирующий запрос: баланс кошелька, сумма по журналу и сумма, пересчитанная из операций."""
+    operations = FinancialOperations.__table__
+    movements = union_all(
+        select(
+            operations.c.wallet.label("wallet"),
+            case((operations.c.operation_type == EXPENSE, -operations.c.amount), else_=operations.c.amount).label("delta"),
+        ).where(operations.c.operation_type != TRANSFER),
+        select(operations.c.wallet_from.label("wallet"), (-operations.c.amount).label("delta"))
+        .where(operations.c.operation_type == TRANSFER),
+        select(operations.c.wallet_to.label("wallet"), operations.c.amount.label("delta"))
+        .where(operations.c.operation_type == TRANSFER),
+    ).subquery()
+    operation_totals = (
+        select(movements.c.wallet, func.sum(movements.c.delta).label("total"))
+        .group_by(movements.c.wallet)
+        .subquery()
+    )
+    ledger_totals = (
+        select(WalletLedger.wallet_id, func.sum(WalletLedger.amount).label("total"))
+        .group_by(WalletLedger.wallet_id)
+        .subquery()
+    )
+
+    wallets = Wallets.__table__
+    return (
+        select(
+            wallets.c.id,
+            wallets.c.name,
+            wallets.c.balance,
+            func.coalesce(ledger_totals.c.total, 0).label("ledger_total"),
+            func.coalesce(operation_totals.c.total, 0).label("expected"),
+        )
+        .select_from(
+            wallets
+            .outerjoin(ledger_totals, ledger_totals.c.wallet_id == wallets.c.id)
+            .outerjoin(operation_totals, operation_totals.c.wallet == wallets.c.name)
+        )
+        .order_by(wallets.c.id)
+    )
@@ -0,0 +1,135 @@
+"""Переводит financial_operations со строковых колонок на DateTime/Date/Numeric
+и доводит созданную до Alembic базу до схемы ревизии 0001_initial.
+
+Запуск: python -m utils.migrate_operations
+"""
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import Column, Date, DateTime, Index, Integer, MetaData, Numeric, String, Table, Text, inspect, text
+
+from database import engine
+from utils.operations import DATE_FORMAT, TIMESTAMP_FORMAT
+
+TABLE = "financial_operations"
+OLD_TABLE = f"{TABLE}_old"
+
+# Таблицы в том виде, в каком их описывает ревизия 0001_initial. Живые модели брать нельзя:
+# после migrate_operations база помечается как 0001, и колонки/индексы из более поздних ревизий
+# (import_batch, индекс по operation_date) те ревизии должны создать сами
+schema_0001 = MetaData()
+
+operations_0001 = Table(
+    TABLE,
+    schema_0001,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("timestamp", DateTime, nullable=False),
+    Column("username", String, nullable=False),
+    Column("operation_date", Date, nullable=False),
+    Column("operation_type", String, nullable=False),
+    Column("accounting_type", String, nullable=False),
+    Column("account_type", String, nullable=False),
+    Column("finish_date", Date),
+    Column("amount", Numeric(12, 2), nullable=False),
+    Column("payment_type", String, nullable=False),
+    Column("comment", String),
+    Column("wallet", String),
+    Column("wallet_from", String),
+    Column("wallet_to", String),
+    Index("ix_financial_operations_username_timestamp", "username", "timestamp"),
+)
+
+# Таблицы, которых нет в базах, созданных до появления очереди Google Таблицы и версий кэша
+missing_0001 = [
+    Table(
+        "sheets_outbox",
+        schema_0001,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("operation_id", Integer, nullable=False, index=True),
+        Column("rows", Text, nullable=False),
+        Column("attempts", Integer, nullable=False),
+        Column("next_attempt_at", DateTime, nullable=False),
+        Column("last_error", Text),
+        Column("created_at", DateTime, nullable=False),
+    ),
+    Table(
+        "cache_versions",
+        schema_0001,
+        Column("name", String, primary_key=True),
+        Column("version", Integer, nullable=False),
+    ),
+]
+
+
+def _parse_row(row):
+    return {
+        "id": row.id,
+        "timestamp": datetime.strptime(row.timestamp, TIMESTAMP_FORMAT),
+        "username": row.username,
+        "operation_date": datetime.strptime(row.operation_date, DATE_FORMAT).date(),
+        "operation_type": row.operation_type,
+        "accounting_type": row.accounting_type,
+        "account_type": row.account_type,
+        "finish_date": datetime.strptime(row.finish_date, DATE_FORMAT).date() if row.finish_date else None,
+        "amount": Decimal(row.amount),
+        "payment_type": row.payment_type,
+        "comment": row.comment,
+        "wallet": row.wallet,
+        "wallet_from": row.wallet_from,
+        "wallet_to": row.wallet_to,
+    }
+
+
+def _migrate_sqlite(connection):
+    # SQLite не умеет менять тип колонки, поэтому пересоздаём таблицу и переносим данные.
+    # Все строки разбираем до изменения схемы: при ошибке разбора таблица остаётся как была
+    rows = connection.execute(text(f"SELECT * FROM {TABLE}")).fetchall()
+
+    converted, errors = [], []
+    for row in rows:
+        try:
+            converted.append(_parse_row(row))
+        except (ValueError, TypeError, InvalidOperation) as e:
+            errors.append(f"id={row.id}: {e}")
+    if errors:
+        raise ValueError("Не удалось разобрать строки:\n" + "\n".join(errors))
+
+    connection.execute(text(f"ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}"))
+    operations_0001.create(connection)
+    if converted:
+        connection.execute(operations_0001.insert(), converted)
+    connection.execute(text(f"DROP TABLE {OLD_TABLE}"))
+    return len(converted)
+
+
+def _migrate_postgresql(connection):
+    connection.execute(text(f"""
+        ALTER TABLE {TABLE}
+            ALTER COLUMN timestamp TYPE TIMESTAMP USING to_timestamp(timestamp, 'DD.MM.YYYY HH24:MI:SS'),
+            ALTER COLUMN operation_date TYPE DATE USING to_date(operation_date, 'DD.MM.YYYY'),
+            ALTER COLUMN finish_date TYPE DATE USING to_date(NULLIF(finish_date, ''), 'DD.MM.YYYY'),
+            ALTER COLUMN amount TYPE NUMERIC(12, 2) USING amount::numeric
+    """))
+    for index in operations_0001.indexes:
+        index.create(connection, checkfirst=True)
+    return connection.execute(text(f"SELECT count(*) FROM {TABLE}")).scalar()
+
+
+def migrate():
+    columns = {column["name"]: column["type"] for column in inspect(engine).get_columns(TABLE)}
+    migrations = {"sqlite": _migrate_sqlite, "postgresql": _migrate_postgresql}
+    if engine.dialect.name not in migrations:
+        raise RuntimeError(f"Миграция не поддерживает СУБД {engine.dialect.name}")
+
+    with engine.begin() as connection:
+        if isinstance(columns["timestamp"], DateTime):
+            print("Таблица financial_operations уже переведена на типизированные колонки")
+        else:
+            count = migrations[engine.dialect.name](connection)
+            print(f"Перенесено операций: {count}")
+        # После этого схема совпадает с 0001_initial и базу можно пометить alembic stamp 0001_initial
+        schema_0001.create_all(connection, tables=missing_0001, checkfirst=True)
+
+
+if __name__ == "__main__":
+    migrate()
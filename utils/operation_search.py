@@ -0,0 +1,168 @@
+import re
+
+from sqlalchemy import and_, column, desc, func, literal_column, or_, select, table, union_all
+
+from database import engine, FinancialOperations
+from utils.operations import operation_to_dict
+
+SEARCH_PAGE_SIZE = 50
+SEARCH_PAGE_MAX_SIZE = 200
+
+# Текст, по которому ищет PostgreSQL. Должен совпадать с выражением индекса из миграции 0007
+SEARCH_DOCUMENT = (
+    "to_tsvector('russian', coalesce(comment, '') || ' ' || coalesce(accounting_type, '') "
+    "|| ' ' || coalesce(account_type, ''))"
+)
+
+FTS_COLUMNS = ("comment", "accounting_type", "account_type")
+# Таблица FTS5 из миграции 0007 (только SQLite). Одноимённая колонка служит для команд FTS5, например 'delete'
+search_index = table(
+    "financial_operations_fts",
+    column("financial_operations_fts"), column("rowid"), *(column(name) for name in FTS_COLUMNS),
+)
+
+
+async def add_to_search_index(db, condition):
+    """Добавляет в индекс SQLite операции, подходящие под условие (в PostgreSQL индекс обновляется сам).
+
+    Вызывать в транзакции операции после её записи: тогда блокировка на запись уже взята
+    и параллельные транзакции не упираются в "database is locked".
+    """
+    if db.url.dialect != "sqlite":
+        return
+    operations = select(FinancialOperations.id, *(getattr(FinancialOperations, name) for name in FTS_COLUMNS))
+    await db.execute(search_index.insert().from_select(["rowid", *FTS_COLUMNS], operations.where(condition)))
+
+
+async def remove_from_search_index(db, operation):
+    """Убирает прежнюю версию операции из индекса SQLite; FTS5 нужны именно те значения, что были проиндексированы."""
+    if db.url.dialect != "sqlite":
+        return
+    await db.execute(search_index.insert().values(
+        financial_operations_fts="delete",
+        rowid=operation["id"],
+        **{name: operation[name] for name in FTS_COLUMNS},
+    ))
+
+
+def _search_terms(q):
+    # Из запроса берём только слова: спецсимволы синтаксиса FTS5 и tsquery пользователь передать не может
+    return re.findall(r"\w+", q.lower())
+
+
+def text_search_condition(dialect, q):
+    """Условие поиска по комментарию, категории и контрагенту; каждое слово ищется по префиксу."""
+    terms = _search_terms(q)
+    if not terms:
+        return None
+    if dialect == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        return FinancialOperations.id.in_(
+            select(search_index.c.rowid).where(search_index.c.financial_operations_fts.op("MATCH")(match))
+        )
+    if dialect == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        return literal_column(SEARCH_DOCUMENT).op("@@")(func.to_tsquery("russian", tsquery))
+    # Прочие СУБД — без индекса
+    return and_(*(
+        or_(
+            FinancialOperations.comment.ilike(f"%{term}%"),
+            FinancialOperations.accounting_type.ilike(f"%{term}%"),
+            FinancialOperations.account_type.ilike(f"%{term}%"),
+        )
+        for term in terms
+    ))
+
+
+def search_conditions(dialect, q=None, username=None, date_from=None, date_to=None, amount_min=None,
+                      amount_max=None, wallet=None, payment_type=None, operation_type=None):
+    conditions = []
+    if q:
+        condition = text_search_condition(dialect, q)
+        if condition is not None:
+            conditions.append(condition)
+    if username:
+        conditions.append(FinancialOperations.username == username)
+    if date_from:
+        conditions.append(FinancialOperations.operation_date >= date_from)
+    if date_to:
+        conditions.append(FinancialOperations.operation_date <= date_to)
+    if amount_min is not None:
+        conditions.append(FinancialOperations.amount >= amount_min)
+    if amount_max is not None:
+        conditions.append(FinancialOperations.amount <= amount_max)
+    if wallet:
+        conditions.append(or_(
+            FinancialOperations.wallet == wallet,
+            FinancialOperations.wallet_from == wallet,
+            FinancialOperations.wallet_to == wallet,
+        ))
+    if payment_type:
+        conditions.append(FinancialOperations.payment_type == payment_type)
+    if operation_type:
+        conditions.append(FinancialOperations.operation_type == operation_type)
+    return conditions
+
+
+async def search_operations(db, conditions, before_id=None, limit=SEARCH_PAGE_SIZE):
+    """Страница результатов от новых дат к старым (keyset-пагинация по (operation_date, id))."""
+    query = FinancialOperations.__table__.select().where(*conditions)
+
+    if before_id is not None:
+        cursor_date = (
+            select(FinancialOperations.operation_date)
+            .where(FinancialOperations.id == before_id)
+            .scalar_subquery()
+        )
+        query = query.where(
+            or_(
+                FinancialOperations.operation_date < cursor_date,
+                and_(FinancialOperations.operation_date == cursor_date, FinancialOperations.id < before_id),
+            )
+        )
+
+    rows = await db.fetch_all(
+        query
+        .order_by(desc(FinancialOperations.operation_date), desc(FinancialOperations.id))
+        .limit(limit + 1)
+    )
+    next_before_id = rows[limit - 1].id if len(rows) > limit else None
+    return [operation_to_dict(row) for row in rows[:limit]], next_before_id
+
+
+async def search_facets(db, conditions):
+    """Количество найденных операций по виду, типу оплаты и кошельку (перемещение считается в обоих кошельках)."""
+    facets = {}
+    for name, facet_column in (("operation_type", FinancialOperations.operation_type),
+                               ("payment_type", FinancialOperations.payment_type)):
+        rows = await db.fetch_all(
+            select(facet_column.label("value"), func.count().label("operations"))
+            .where(*conditions)
+            .group_by(facet_column)
+            .order_by(desc("operations"))
+        )
+        facets[name] = {row.value: row.operations for row in rows if row.value}
+
+    wallets = union_all(*(
+        select(wallet_column.label("wallet")).where(*conditions, wallet_column.isnot(None))
+        for wallet_column in (FinancialOperations.wallet, FinancialOperations.wallet_from, FinancialOperations.wallet_to)
+    )).subquery()
+    rows = await db.fetch_all(
+        select(wallets.c.wallet, func.count().label("operations"))
+        .group_by(wallets.c.wallet)
+        .order_by(desc("operations"))
+    )
+    facets["wallet"] = {row.wallet: row.operations for row in rows if row.wallet}
+    return facets
+
+
+def rebuild_search_index():
+    # Нужно, если операции менялись в обход приложения (например, скриптами из utils)
+    with engine.begin() as connection:
+        if connection.dialect.name == "sqlite":
+            connection.execute(search_index.insert().values(financial_operations_fts="rebuild"))
+
+
+if __name__ == "__main__":
+    rebuild_search_index()
+    print("Поисковый индекс операций перестроен")
@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import OperationTotals
+from utils.ledger import EXPENSE, TRANSFER
+
+# Разрезы, по которым можно группировать отчёт; вид операции есть в отчёте всегда
+REPORT_DIMENSIONS = ("month", "accounting_type", "account_type", "wallet")
+
+_dialect_inserts = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def operation_total_entries(operation):
+    """Вклад операции в сводку: список (ключ, поступление, списание).
+
+    Перемещение даёт две записи: списание с wallet_from и поступление в wallet_to.
+    """
+    amount = Decimal(operation["amount"] or 0)
+    key = {
+        "month": operation["operation_date"].replace(day=1),
+        "operation_type": operation["operation_type"],
+        "accounting_type": operation["accounting_type"] or "",
+        "account_type": operation["account_type"] or "",
+    }
+    if operation["operation_type"] == TRANSFER:
+        return [
+            (dict(key, wallet=operation["wallet_from"] or ""), Decimal(0), amount),
+            (dict(key, wallet=operation["wallet_to"] or ""), amount, Decimal(0)),
+        ]
+    if operation["operation_type"] == EXPENSE:
+        return [(dict(key, wallet=operation["wallet"] or ""), Decimal(0), amount)]
+    return [(dict(key, wallet=operation["wallet"] or ""), amount, Decimal(0))]
+
+
+async def add_to_operation_totals(db, entries):
+    # Вставка с ON CONFLICT атомарна: параллельные операции с одним ключом не теряют сумм
+    insert = _dialect_inserts[db.url.dialect]
+    table = OperationTotals.__table__
+    for key, amount_in, amount_out in entries:
+        if not amount_in and not amount_out:
+            continue
+        query = insert(table).values(**key, amount_in=amount_in, amount_out=amount_out)
+        query = query.on_conflict_do_update(
+            index_elements=list(key),
+            set_={
+                "amount_in": table.c.amount_in + query.excluded.amount_in,
+                "amount_out": table.c.amount_out + query.excluded.amount_out,
+            },
+        )
+        await db.execute(query)
+
+
+async def apply_operation_totals(db, operation, sign=1):
+    """Добавляет операцию в сводку (sign=1) или убирает её оттуда (sign=-1).
+
+    Вызывается в той же транзакции, что и изменение самой операции.
+    """
+    await add_to_operation_totals(db, [
+        (key, amount_in * sign, amount_out * sign)
+        for key, amount_in, amount_out in operation_total_entries(operation)
+    ])
+
+
+def totals_report_query(group_by, month_from=None, month_to=None, operation_type=None, wallet=None):
+    # month_from и month_to — первые числа месяцев; оба месяца входят в отчёт целиком
+    columns = [OperationTotals.operation_type] + [getattr(OperationTotals, name) for name in group_by]
+    amount_in = func.sum(OperationTotals.amount_in)
+    amount_out = func.sum(OperationTotals.amount_out)
+    query = select(*columns, amount_in.label("amount_in"), amount_out.label("amount_out"))
+    if month_from:
+        query = query.where(OperationTotals.month >= month_from)
+    if month_to:
+        query = query.where(OperationTotals.month <= month_to)
+    if operation_type:
+        query = query.where(OperationTotals.operation_type == operation_type)
+    if wallet:
+        query = query.where(OperationTotals.wallet == wallet)
+    return (
+        query
+        .group_by(*columns)
+        # Ключи, обнулившиеся после удаления операций, в отчёт не попадают
+        .having(or_(amount_in != 0, amount_out != 0))
+        .order_by(*columns)
+    )
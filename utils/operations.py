@@ -0,0 +1,44 @@
+from datetime import datetime
+
+# Форматы дат, в которых операции показываются в мини-приложении и пишутся в Google Таблицу
+DATE_FORMAT = "%d.%m.%Y"
+TIMESTAMP_FORMAT = "%d.%m.%Y %H:%M:%S"
+
+
+def parse_date(date: str):
+    # Даты из форм приходят в формате input type="date"
+    return datetime.strptime(date, "%Y-%m-%d").date()
+
+
+def format_date(date_obj) -> str:
+    return date_obj.strftime(DATE_FORMAT) if date_obj else ""
+
+
+def format_timestamp(timestamp) -> str:
+    return timestamp.strftime(TIMESTAMP_FORMAT) if timestamp else ""
+
+
+def format_amount(amount) -> str:
+    # 1500.00 -> "1500", 10.50 -> "10.5"
+    if amount is None:
+        return ""
+    return format(amount.normalize(), "f")
+
+
+def operation_to_dict(row) -> dict:
+    return {
+        'id': row.id,
+        'timestamp': format_timestamp(row.timestamp),
+        'username': row.username,
+        'operation_date': format_date(row.operation_date),
+        'operation_type': row.operation_type,
+        'accounting_type': row.accounting_type,
+        'account_type': row.account_type,
+        'finish_date': format_date(row.finish_date),
+        'amount': format_amount(row.amount),
+        'payment_type': row.payment_type,
+        'comment': row.comment,
+        'wallet': row.wallet,
+        'wallet_from': row.wallet_from,
+        'wallet_to': row.wallet_to
+    }
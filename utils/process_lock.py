@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировок между процессами нет, процесс считается единственным
+    fcntl = None
+
+# Файлы блокировок должны лежать в общем для всех воркеров каталоге
+LOCK_DIR = os.getenv("LOCK_DIR", tempfile.gettempdir())
+
+
+class ProcessLock:
+    """Блокировка между процессами приложения на одной машине (flock на файл).
+
+    Снимается операционной системой, если процесс-владелец завершился, поэтому
+    после падения воркера её может забрать другой процесс.
+    """
+
+    def __init__(self, name: str):
+        self.path = os.path.join(LOCK_DIR, f"bloom-{name}.lock")
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if self._file is not None:
+            return True
+        file = open(self.path, "a")
+        if fcntl is not None:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(file, flags)
+            except BlockingIOError:
+                file.close()
+                return False
+        self._file = file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
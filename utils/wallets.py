@@ -1,18 +1,62 @@
+from fastapi import HTTPException
+from sqlalchemy import select
+
 from database import Wallets
 
+# Первая строка таблицы кошельков на листе "Балансы"
+FIRST_ROW = 7
+
+# Последний отправленный в Google Таблицу снимок: список пар (кошелёк, баланс)
+_last_pushed = None
+
+
+async def _write_all_wallets(worksheet, snapshot):
+    await worksheet.batch_clear([f'C{FIRST_ROW}:C', f'D{FIRST_ROW}:D'])
+
+    if snapshot:
+        await worksheet.update(f'C{FIRST_ROW}', [[name, balance] for name, balance in snapshot])
+
+
+async def _write_changed_balances(worksheet, changed):
+    await worksheet.batch_update([
+        {"range": f'D{FIRST_ROW + index}', "values": [[balance]]}
+        for index, balance in changed
+    ])
+
 
 async def update_wallets_on_google_sheet(db, worksheet):
-    wallets = await db.fetch_all(Wallets.__table__.select())
+    global _last_pushed
+
+    wallets = await db.fetch_all(
+        select(Wallets.name, Wallets.balance).order_by(Wallets.id)
+    )
+    snapshot = [(wallet.name, float(wallet.balance)) for wallet in wallets]
 
-    wallet_names = []
-    wallet_balances = []
+    if _last_pushed is None or [name for name, _ in snapshot] != [name for name, _ in _last_pushed]:
+        # Список кошельков изменился — переписываем таблицу целиком
+        await _write_all_wallets(worksheet, snapshot)
+    else:
+        changed = [
+            (index, balance)
+            for index, ((_, balance), (_, pushed_balance)) in enumerate(zip(snapshot, _last_pushed))
+            if balance != pushed_balance
+        ]
+        if changed:
+            await _write_changed_balances(worksheet, changed)
 
-    for wallet in wallets:
-        wallet_names.append([wallet.name])
-        wallet_balances.append([float(wallet.balance)])
+    _last_pushed = snapshot
 
-    worksheet.batch_clear(['C7:C', 'D7:D'])
 
-    if wallet_names:
-        worksheet.update('C7', wallet_names)
-        worksheet.update('D7', wallet_balances)
+async def apply_wallet_delta(db, wallet_name, delta):
+    # Баланс меняем на стороне БД одним запросом, без чтения текущего значения,
+    # поэтому параллельные операции по одному кошельку не теряют изменения
+    query = (
+        Wallets.__table__.update()
+        .where(Wallets.name == wallet_name)
+        .values(balance=Wallets.balance + delta)
+        .returning(Wallets.id)
+    )
+    wallet_id = await db.fetch_val(query)
+    if wallet_id is None:
+        raise HTTPException(status_code=404, detail=f"Wallet {wallet_name} not found")
+    return wallet_id